@@ -1,43 +1,258 @@
 """Main game file"""
 from __future__ import absolute_import
 
+import argparse
+import random
 import sys
+import time
+from typing import Optional
 
 import pygame
 
+from src.clock import GameClock, RealTimeClock, ScaledClock, SteppedClock
 from src.config import config
+from src.input import InputSource, KeyboardInput, ScriptedInput
 from src.level import Level
+from src.profiler import profiler
+from src.replay import Recorder, Replay
+from src.utils import map_generator
 
 
 class Game:
     """Declaration of a Breath of Python Game"""
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            headless: bool = False,
+            input_source: Optional[InputSource] = None,
+            game_clock: Optional[GameClock] = None,
+            seed: Optional[int] = None,
+            record_path: Optional[str] = None
+        ) -> None:
+        """Initializes the Game class
+
+        Args:
+            headless (bool, optional): Whether the game runs without a window, the level is then
+                only simulated with `simulate`, never drawn. Defaults to False.
+            input_source (InputSource, optional): The source of the player input. Defaults to the
+                keyboard, or to no input at all in headless mode.
+            game_clock (GameClock, optional): The clock of the gameplay timers. Defaults to the
+                real time, or to a clock stepped by the simulation ticks in headless mode.
+            seed (int, optional): The seed of the level. Defaults to a random seed.
+            record_path (str, optional): The file the game is recorded to, saved by
+                `save_recording`. Defaults to None, no recording.
+        """
         pygame.init()
 
         self.clock = pygame.time.Clock()
 
         self.config = config
-        self.screen = pygame.display.set_mode((config.width, config.height))
-        pygame.display.set_caption('Breath of Python')
+        self.headless = headless
+        if headless:
+            self.screen = None
+            input_source = input_source or ScriptedInput([])
+            game_clock = game_clock or SteppedClock()
+        else:
+            self.screen = pygame.display.set_mode((config.width, config.height))
+            pygame.display.set_caption('Breath of Python')
+            input_source = input_source or KeyboardInput()
+            game_clock = game_clock or RealTimeClock()
+
+        # Recording the seed, keys and times, the level reads them through the recorder
+        seed = random.randrange(2 ** 32) if seed is None else seed
+        self.record_path = record_path
+        self.recorder = None
+        if record_path:
+            self.recorder = Recorder(seed, input_source, game_clock)
+            input_source, game_clock = self.recorder.input, self.recorder.clock
+
+        self.level = Level(headless, input_source, game_clock, seed)
+
+    def save_recording(self) -> None:
+        """Writes the recording of the game, if it is recorded"""
+        if self.recorder:
+            self.recorder.save(self.record_path, self.level.state_digest())
+
+    def run(self, trace_path: Optional[str] = None) -> None:
+        """Run the game
+
+        The simulation advances in fixed ticks of 1 / config.tick_rate seconds, as many as the
+        elapsed time requires (scaled by the rate of the game clock), independently of the rendering
+        rate. A slow frame is caught up with at most config.max_catch_up_ticks ticks, the remaining
+        time is dropped. The stepped clocks (e.g. a `ScaledClock`) only move with the ticks, so that
+        the timers never drift from the movements when time is dropped.
+
+        The profiler overlay and trace recording are toggled with config.profiler_overlay_key and
+        config.profiler_trace_key. A trace still being recorded is exported when the game is quit,
+        as is the recording of the game.
 
-        self.level = Level()
+        Args:
+            trace_path (str, optional): The file the profiler traces are exported to. Defaults to
+                config.profiler_trace_path.
+        """
+        trace_path = trace_path or config.profiler_trace_path
+        tick_duration = 1000 / config.tick_rate
+        accumulator = 0.0
+        previous_time = pygame.time.get_ticks()
 
-    def run(self):
-        """Run the game"""
         while True:
+            profiler.begin_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    if profiler.recording:
+                        profiler.toggle_recording(trace_path)
+                    self.save_recording()
                     pygame.quit()
                     sys.exit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == config.profiler_overlay_key:
+                        profiler.toggle_overlay()
+                    elif event.key == config.profiler_trace_key:
+                        profiler.toggle_recording(trace_path)
+            profiler.lap('events')
+
+            current_time = pygame.time.get_ticks()
+            accumulator += (current_time - previous_time) * self.level.clock.rate
+            previous_time = current_time
+
+            ticks = 0
+            while accumulator >= tick_duration and ticks < config.max_catch_up_ticks:
+                self.level.update()
+                accumulator -= tick_duration
+                ticks += 1
+            if accumulator >= tick_duration:
+                accumulator %= tick_duration
 
             self.screen.fill('black')
-            self.level.run()
+            alpha = accumulator / tick_duration if config.render_interpolation else 1.0
+            self.level.draw(alpha)
+            profiler.draw_overlay()
+            profiler.lap('overlay')
 
             pygame.display.update()
+            profiler.lap('present')
+            profiler.end_frame()
+
             self.clock.tick(config.fps)
 
+    def simulate(self, ticks: Optional[int] = None) -> int:
+        """Runs the simulation as fast as possible, without drawing nor handling the events
+
+        Args:
+            ticks (int, optional): The number of ticks to run. Defaults to running until the
+                scripted input is over.
+
+        Returns:
+            int: The number of ticks run.
+        """
+        input_source = self.level.input_source
+        tick = 0
+        while tick != ticks:
+            if ticks is None and input_source.finished:
+                break
+            profiler.begin_frame()
+            self.level.update()
+            profiler.end_frame()
+            tick += 1
+
+        return tick
+
+
+def main() -> None:
+    """Runs the game, or a headless simulation"""
+    parser = argparse.ArgumentParser(description='Breath of Python')
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='simulate the level without a window, as fast as possible'
+    )
+    parser.add_argument(
+        '--ticks',
+        type=int,
+        help='number of ticks to simulate in headless mode (default: until the script is over)'
+    )
+    parser.add_argument(
+        '--speed',
+        type=float,
+        help='speed factor of the simulation, the game time being stepped by its ticks (default: '
+             'real time; headless mode always simulates as fast as possible)'
+    )
+    parser.add_argument(
+        '--script',
+        help='JSON file of [ticks, [key names]] steps scripting the player input'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='seed of the random choices of the level (default: random)'
+    )
+    parser.add_argument(
+        '--record',
+        metavar='REPLAY',
+        help='record the seed, keys and clock of every tick to a JSON file'
+    )
+    parser.add_argument(
+        '--replay',
+        metavar='REPLAY',
+        help='replay a recorded game, checking in headless mode that it ends in the same state'
+    )
+    parser.add_argument(
+        '--map',
+        metavar='FOLDER',
+        help='play a map generated by src.utils.map_generator in FOLDER instead of the default map'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='TRACE',
+        help='record the timings of the phases of every frame to a .csv or .json trace file'
+    )
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler.toggle_recording()
+
+    if args.map:
+        config.map_layers = map_generator.map_layers(args.map)
+        config.compiled_map_path = map_generator.compiled_map_path(args.map)
+
+    if args.replay and (args.script or args.speed or args.seed is not None):
+        parser.error('--replay can not be combined with --script, --speed or --seed')
+
+    input_source = ScriptedInput.from_file(args.script) if args.script else None
+    game_clock = ScaledClock(args.speed) if args.speed else None
+    seed = args.seed
+    replay = Replay(args.replay) if args.replay else None
+    if replay:
+        input_source, game_clock, seed = replay.input, replay.clock, replay.seed
+
+    if not args.headless:
+        Game(
+            input_source=input_source,
+            game_clock=game_clock,
+            seed=seed,
+            record_path=args.record
+        ).run(args.profile)
+        return
+
+    if args.ticks is None and args.script is None and replay is None:
+        parser.error('--headless requires --ticks, --script or --replay')
+
+    game = Game(True, input_source, game_clock, seed, args.record)
+    start = time.perf_counter()
+    ticks = game.simulate(args.ticks)
+    elapsed = time.perf_counter() - start
+    print(f'{ticks} ticks in {elapsed:.3f} s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)')
+
+    if args.profile:
+        profiler.toggle_recording(args.profile)
+    game.save_recording()
+
+    if replay and ticks == replay.ticks:
+        identical = game.level.state_digest() == replay.state
+        print('Replay state: ' + ('identical' if identical else 'DIFFERENT'))
+        if not identical:
+            sys.exit(1)
+
 
 if __name__ == '__main__':
-    game = Game()
-    game.run()
+    main()
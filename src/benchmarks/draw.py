@@ -0,0 +1,113 @@
+"""Benchmark of the sprite drawing path of the camera group
+
+Compares the per-sprite blit (with a Vector2 offset per sprite) to the batched submission used by
+`YSortCameraGroup.custom_draw`.
+
+Usage:
+    python -m src.benchmarks.draw [--sizes 1000 10000 50000] [--frames 30]
+"""
+from __future__ import absolute_import
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+
+import pygame
+
+from src.config import config
+from src.utils.utils import blit_batch
+
+
+def _make_sprites(count: int, seed: int = 0) -> List[pygame.sprite.Sprite]:
+    """Creates sprites scattered over the screen, sharing a few images like the tiles do"""
+    rng = random.Random(seed)
+    images = []
+    for index in range(8):
+        image = pygame.Surface((config.tilesize, config.tilesize), pygame.SRCALPHA)
+        pygame.draw.circle(image, (32 * index, 200, 100), image.get_rect().center, 24)
+        images.append(image)
+
+    sprites = []
+    for _ in range(count):
+        sprite = pygame.sprite.Sprite()
+        sprite.image = rng.choice(images)
+        sprite.rect = sprite.image.get_rect(
+            topleft=(rng.randrange(config.width), rng.randrange(config.height))
+        )
+        sprites.append(sprite)
+
+    return sprites
+
+
+def draw_per_sprite(
+        surface: pygame.Surface,
+        sprites: List[pygame.sprite.Sprite],
+        offset: pygame.math.Vector2
+    ) -> None:
+    """The former drawing path, one blit and one offset vector per sprite"""
+    for sprite in sprites:
+        offset_pos = sprite.rect.topleft - offset
+        surface.blit(sprite.image, offset_pos)
+
+
+def draw_batched(
+        surface: pygame.Surface,
+        sprites: List[pygame.sprite.Sprite],
+        offset: pygame.math.Vector2
+    ) -> None:
+    """The current drawing path, the sequence is built in bulk and submitted in one call"""
+    offset_x = int(offset.x)
+    offset_y = int(offset.y)
+    blit_batch(surface, [
+        (sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y)) for sprite in sprites
+    ])
+
+
+def run(sizes: List[int], frames: int) -> Dict[int, Dict[str, float]]:
+    """Times both drawing paths for each number of sprites
+
+    Args:
+        sizes (List[int]): The numbers of sprites to draw.
+        frames (int): The number of frames drawn per measure.
+
+    Returns:
+        Dict[int, Dict[str, float]]: The mean time per frame in milliseconds of each path, keyed by
+            number of sprites.
+    """
+    paths: Dict[str, Callable] = {'per_sprite': draw_per_sprite, 'batched': draw_batched}
+    surface = pygame.Surface((config.width, config.height))
+    offset = pygame.math.Vector2(0, 0)
+    results = {}
+
+    for size in sizes:
+        sprites = _make_sprites(size)
+        results[size] = {}
+        for name, draw in paths.items():
+            draw(surface, sprites, offset)
+            start = time.perf_counter()
+            for _ in range(frames):
+                draw(surface, sprites, offset)
+            results[size][name] = (time.perf_counter() - start) * 1000 / frames
+
+    return results
+
+
+def main() -> None:
+    """Command line entry point of the drawing benchmark"""
+    parser = argparse.ArgumentParser(description='Compare the per-sprite and batched draw paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--frames', type=int, default=30)
+    args = parser.parse_args()
+
+    pygame.init()
+    for size, timings in run(args.sizes, args.frames).items():
+        speedup = timings['per_sprite'] / timings['batched']
+        print(
+            f'{size:>6} sprites: per sprite {timings["per_sprite"]:8.2f} ms, '
+            f'batched {timings["batched"]:8.2f} ms (x{speedup:.2f})'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,498 @@
+"""Scenario benchmarks of the whole simulation, with regression checks against a baseline
+
+Each scenario builds the real `Level` in headless mode, with a stepped clock, a scripted input and
+a fixed seed, sets up a situation (no obstacles, dense grass, hordes of enemies chasing the player,
+continuous attacks, particle storms, a huge generated map) and simulates it as fast as possible.
+The report gives the simulated ticks per second, the mean and 99th percentile time of each phase of
+the frame, measured by the profiler, and the memory used by the scenario, measured in a separate
+process so that the scenarios run before do not count:
+    - the growth of the peak resident memory of the process while the scenario is built and
+      simulated (where the `resource` module is available), which counts the pixels of the SDL
+      surfaces,
+    - the peak memory allocated by Python in a second run, traced by `tracemalloc` which does not
+      see the SDL surfaces.
+
+The results can be saved as JSON and compared to a saved baseline, the command failing if a
+scenario got slower or used more memory than the baseline by more than a threshold.
+
+With --check-store, the scenarios are not measured but simulated with and without the entity store,
+the command failing if they do not end in the same state (`Level.state_digest`).
+
+Usage:
+    python -m src.benchmarks.scenarios [--scenarios empty enemies_100] [--ticks 300]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.1] [--check-store]
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from math import ceil
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - the resource module is only available on Unix
+    resource = None
+
+import pygame
+
+from main import Game
+from src.clock import SteppedClock
+from src.config import config
+from src.input import ScriptedInput
+from src.level import Level
+from src.profiler import profiler
+from src.utils import map_generator
+
+
+# The player walks around in a square, attacking on the way
+WALK = [[40, ['d']], [40, ['s']], [40, ['q']], [40, ['z']]]
+ATTACK = [[1, ['SPACE']]]
+
+WARMUP_TICKS = 30
+
+
+def _cells_around(level: Level, radius: int) -> Iterator[Tuple[int, int]]:
+    """Yields the walkable cells within a square of radius tiles around the player"""
+    grid = level.obstacle_sprites
+    player_col = level.player.hitbox.centerx // config.tilesize
+    player_row = level.player.hitbox.centery // config.tilesize
+
+    for row in range(max(player_row - radius, 0), min(player_row + radius + 1, grid.rows)):
+        for col in range(max(player_col - radius, 0), min(player_col + radius + 1, grid.cols)):
+            if not grid.occupancy[row * grid.cols + col]:
+                yield col, row
+
+
+def _clear(level: Level) -> None:
+    """Removes every sprite but the player, and every tile"""
+    for sprite in list(level.visible_sprites) + list(level.obstacle_sprites):
+        if sprite is not level.player:
+            sprite.kill()
+    if level.tiles is not None:
+        level.tiles.clear()
+
+
+def _setup_nothing(level: Level) -> None:
+    pass
+
+
+def _setup_empty(level: Level) -> None:
+    _clear(level)
+
+
+def _setup_dense_grass(level: Level) -> None:
+    """Covers every free tile around the player with grass, but the tiles next to the player"""
+    player_col = level.player.hitbox.centerx // config.tilesize
+    player_row = level.player.hitbox.centery // config.tilesize
+    for col, row in list(_cells_around(level, 40)):
+        if abs(col - player_col) > 1 or abs(row - player_row) > 1:
+            level._create_cell('grass', col, row, 0)
+
+
+def _setup_enemies(count: int) -> Callable[[Level], None]:
+    """Returns a setup replacing the enemies by count enemies within notice radius of the player"""
+    def setup(level: Level) -> None:
+        for enemy in list(level.enemy_sprites):
+            enemy.kill()
+
+        rng = random.Random(count)
+        radius = min(info['notice_radius'] for info in config.monster_data.values())
+        cells = list(_cells_around(level, radius // config.tilesize - 1))
+        values = [int(value) for value in config.monster_tile_ids]
+        for _ in range(count):
+            col, row = rng.choice(cells)
+            level._create_cell('entities', col, row, rng.choice(values))
+
+    return setup
+
+
+def _spam_particles(level: Level, tick: int, count: int = 10) -> None:
+    """Creates count leaves particles around the player every tick"""
+    rng = random.Random(tick)
+    for _ in range(count):
+        position = (
+            level.player.rect.centerx + rng.randint(-300, 300),
+            level.player.rect.centery + rng.randint(-300, 300)
+        )
+        level.animation_player.create_grass_particles(position, [level.visible_sprites])
+
+
+def _particle_storm(level: Level, tick: int) -> None:
+    _spam_particles(level, tick, 100)
+
+
+class Scenario:
+    """A situation to simulate
+
+    Attributes:
+        name (str): The name of the scenario.
+        setup (Callable[[Level], None]): Function preparing the level.
+        script (List): The steps of the scripted input, looped.
+        on_tick (Optional[Callable[[Level, int], None]]): Function called before each tick.
+        map_size (Optional[int]): The size in tiles of the square map generated for the scenario,
+            None to play the default map.
+        overrides (Dict[str, object]): The config values set while the level is built.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            setup: Callable[[Level], None],
+            script: List,
+            on_tick: Optional[Callable[[Level, int], None]] = None,
+            map_size: Optional[int] = None,
+            overrides: Optional[Dict[str, object]] = None
+        ) -> None:
+        self.name = name
+        self.setup = setup
+        self.script = script
+        self.on_tick = on_tick
+        self.map_size = map_size
+        self.overrides = overrides or {}
+
+    def _generate_map(self) -> str:
+        """Generates the map of the scenario once, returns its folder"""
+        folder = os.path.join(tempfile.gettempdir(), f'bop_map_{self.map_size}')
+        if not all(map(os.path.isfile, map_generator.map_layers(folder).values())):
+            map_generator.generate_map(self.map_size, self.map_size, folder, seed=0)
+        return folder
+
+    def build(self) -> Game:
+        """Creates a headless game with the config overrides of the scenario, prepares its level"""
+        overrides = dict(self.overrides)
+        if self.map_size is not None:
+            folder = self._generate_map()
+            overrides['map_layers'] = map_generator.map_layers(folder)
+            overrides['compiled_map_path'] = map_generator.compiled_map_path(folder)
+
+        saved = {name: getattr(config, name) for name in overrides}
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        try:
+            game = Game(
+                headless=True,
+                input_source=ScriptedInput(self.script, loop=True),
+                game_clock=SteppedClock(),
+                seed=0
+            )
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+
+        self.setup(game.level)
+        return game
+
+    def simulate(self, game: Game, ticks: int) -> None:
+        """Runs ticks of the game, calling the tick hook of the scenario"""
+        if self.on_tick is None:
+            game.simulate(ticks)
+            return
+
+        for tick in range(ticks):
+            self.on_tick(game.level, tick)
+            game.simulate(1)
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario('empty', _setup_empty, WALK),
+        Scenario('dense_grass', _setup_dense_grass, WALK),
+        Scenario('enemies_100', _setup_enemies(100), WALK),
+        Scenario('enemies_1000', _setup_enemies(1000), WALK),
+        Scenario('enemies_5000', _setup_enemies(5000), WALK),
+        Scenario(
+            'enemies_1000_store',
+            _setup_enemies(1000),
+            WALK,
+            overrides={'entity_store': True}
+        ),
+        Scenario('attack_particles', _setup_dense_grass, ATTACK, _spam_particles),
+        Scenario('particle_storm', _setup_nothing, WALK, _particle_storm),
+        Scenario(
+            'particle_storm_batched',
+            _setup_nothing,
+            WALK,
+            _particle_storm,
+            overrides={'batched_particles': True}
+        ),
+        Scenario('large_map', _setup_nothing, WALK, map_size=500),
+    )
+}
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+def _peak_rss() -> Optional[int]:
+    """Returns the peak resident memory of the process in KiB, None if it can not be measured
+
+    It is read from /proc on Linux, where `ru_maxrss` carries the peak of the parent process over
+    to the processes it starts.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as status_file:
+            for line in status_file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Counted in bytes on macOS and in KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure_memory(scenario: Scenario, ticks: int) -> Dict:
+    """Simulates a scenario twice to measure its memory, in a process running nothing else
+
+    Args:
+        scenario (Scenario): The scenario to run.
+        ticks (int): The number of ticks measured, after a warmup.
+
+    Returns:
+        Dict: The growth of the peak resident memory of the process in KiB, SDL surfaces included
+            (None when not available), and the peak memory allocated by Python in KiB.
+    """
+    rss_before = _peak_rss()
+    scenario.simulate(scenario.build(), WARMUP_TICKS + ticks)
+    rss_after = _peak_rss()
+
+    tracemalloc.start()
+    scenario.simulate(scenario.build(), WARMUP_TICKS + ticks)
+    peak_memory = tracemalloc.get_traced_memory()[1] // 1024
+    tracemalloc.stop()
+
+    return {
+        'peak_memory_kb': peak_memory,
+        'peak_rss_kb': rss_after - rss_before if rss_before is not None else None
+    }
+
+
+def _measure_memory_apart(name: str, ticks: int) -> Dict:
+    """Runs `measure_memory` in a new process, the last line of its output being the result"""
+    output = subprocess.run(
+        [
+            sys.executable, '-m', 'src.benchmarks.scenarios',
+            '--memory-of', name,
+            '--ticks', str(ticks)
+        ],
+        capture_output=True,
+        check=True,
+        text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def run_scenario(scenario: Scenario, ticks: int, memory: bool = True) -> Dict:
+    """Simulates a scenario and measures it
+
+    Args:
+        scenario (Scenario): The scenario to run.
+        ticks (int): The number of ticks measured, after a warmup.
+        memory (bool, optional): Whether to measure the memory of the scenario in a separate
+            process, with `measure_memory`, the traced run being slow. Defaults to True.
+
+    Returns:
+        Dict: The ticks, seconds, ticks per second ('fps'), mean and p99 time of each phase in
+            milliseconds, statistics watched by the profiler (e.g. the pools), peak memory
+            allocated by Python and growth of the peak resident memory in KiB (None when not
+            measured).
+    """
+    game = scenario.build()
+    scenario.simulate(game, WARMUP_TICKS)
+
+    profiler.start_recording()
+    start = time.perf_counter()
+    scenario.simulate(game, ticks)
+    elapsed = time.perf_counter() - start
+    trace = profiler.stop_recording()
+
+    phases = {}
+    for phase in dict.fromkeys(phase for frame in trace for phase in frame):
+        if phase == 'index':
+            continue
+        durations = [frame.get(phase, 0.0) for frame in trace]
+        phases[phase] = {
+            'mean': sum(durations) / len(durations),
+            'p99': _percentile(durations, 99)
+        }
+    counters = {name: counter() for name, counter in profiler.counters.items()}
+
+    measures = {'peak_memory_kb': None, 'peak_rss_kb': None}
+    if memory:
+        measures = _measure_memory_apart(scenario.name, ticks)
+
+    return {
+        'ticks': ticks,
+        'seconds': elapsed,
+        'fps': ticks / elapsed,
+        'phases': phases,
+        'counters': counters,
+        **measures
+    }
+
+
+def check_entity_store(scenario: Scenario, ticks: int) -> Optional[str]:
+    """Simulates a scenario with and without the entity store, checking that they end identically
+
+    Args:
+        scenario (Scenario): The scenario to run.
+        ticks (int): The number of ticks simulated, after a warmup.
+
+    Returns:
+        Optional[str]: The description of the mismatch, None if the states are identical.
+    """
+    digests = []
+    for enabled in (False, True):
+        variant = Scenario(
+            scenario.name,
+            scenario.setup,
+            scenario.script,
+            scenario.on_tick,
+            scenario.map_size,
+            dict(scenario.overrides, entity_store=enabled)
+        )
+        game = variant.build()
+        variant.simulate(game, WARMUP_TICKS + ticks)
+        digests.append(game.level.state_digest())
+
+    if digests[0] != digests[1]:
+        return f'{scenario.name}: state {digests[1]} with the entity store, {digests[0]} without'
+    return None
+
+
+def run(names: List[str], ticks: int, memory: bool = True) -> Dict:
+    """Runs scenarios
+
+    Args:
+        names (List[str]): The names of the scenarios to run.
+        ticks (int): The number of ticks measured per scenario.
+        memory (bool, optional): Whether to measure the peak memory. Defaults to True.
+
+    Returns:
+        Dict: The environment and the results of each scenario.
+    """
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform()
+        },
+        'scenarios': {name: run_scenario(SCENARIOS[name], ticks, memory) for name in names}
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Lists the regressions of results compared to a baseline
+
+    Args:
+        results (Dict): The results of the current run.
+        baseline (Dict): The results of the baseline run.
+        threshold (float): The relative loss tolerated, e.g. 0.1 for 10%.
+
+    Returns:
+        List[str]: The description of each regression, empty if there is none.
+    """
+    regressions = []
+    for name, result in results['scenarios'].items():
+        reference = baseline['scenarios'].get(name)
+        if reference is None:
+            continue
+
+        if result['fps'] < reference['fps'] * (1 - threshold):
+            regressions.append(
+                f'{name}: {result["fps"]:.0f} ticks/s, baseline {reference["fps"]:.0f} ticks/s'
+            )
+
+        for key, label in (('peak_memory_kb', 'peak memory'), ('peak_rss_kb', 'peak RSS growth')):
+            memory, reference_memory = result.get(key), reference.get(key)
+            if memory is not None and reference_memory is not None \
+                    and memory > reference_memory * (1 + threshold):
+                regressions.append(
+                    f'{name}: {label} {memory} KiB, baseline {reference_memory} KiB'
+                )
+
+    return regressions
+
+
+def main() -> None:
+    """Command line entry point of the scenario benchmarks"""
+    parser = argparse.ArgumentParser(description='Benchmark the simulation on scenarios')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory runs')
+    parser.add_argument(
+        '--memory-of',
+        choices=list(SCENARIOS),
+        metavar='SCENARIO',
+        help='only measure the memory of a scenario and print it as JSON (run by the memory runs)'
+    )
+    parser.add_argument('--output', help='JSON file the results are saved to')
+    parser.add_argument('--baseline', help='JSON file of results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument(
+        '--check-store',
+        action='store_true',
+        help='check that the scenarios end in the same state with and without the entity store'
+    )
+    args = parser.parse_args()
+
+    if args.check_store:
+        mismatches = []
+        for name in args.scenarios:
+            mismatch = check_entity_store(SCENARIOS[name], args.ticks)
+            print(f'MISMATCH {mismatch}' if mismatch else f'{name:<24}identical')
+            if mismatch:
+                mismatches.append(mismatch)
+        if mismatches:
+            sys.exit(1)
+        return
+
+    if args.memory_of:
+        print(json.dumps(measure_memory(SCENARIOS[args.memory_of], args.ticks)))
+        return
+
+    results = run(args.scenarios, args.ticks, not args.no_memory)
+
+    for name, result in results['scenarios'].items():
+        memory, rss = result['peak_memory_kb'], result['peak_rss_kb']
+        print(
+            f'{name:<24}{result["fps"]:>10.0f} ticks/s'
+            + (f'{memory:>10} KiB peak (Python)' if memory is not None else '')
+            + (f'{rss:>10} KiB peak RSS growth' if rss is not None else '')
+        )
+        for phase, timings in result['phases'].items():
+            print(f'    {phase:<14}{timings["mean"]:>8.3f} ms{timings["p99"]:>8.3f} ms p99')
+        for counter_name, counter in result['counters'].items():
+            values = ' '.join(f'{key} {value:.4g}' for key, value in counter.items())
+            print(f'    {counter_name:<14}{values}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
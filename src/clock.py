@@ -0,0 +1,106 @@
+"""Clocks the gameplay timers (cooldowns, invincibility, flicker) read the time from
+
+The level owns a clock and hands it to every entity, so that the time of the game can run:
+    - in real time (`RealTimeClock`), the default,
+    - only when stepped (`SteppedClock`), by one simulation tick at each level update, so that the
+      timers follow the simulation whatever its speed and the runs are deterministic,
+    - faster or slower than real time (`ScaledClock`), the game loop simulating more or fewer ticks
+      per second while the clock is stepped by them.
+"""
+from __future__ import absolute_import
+
+from abc import ABC, abstractmethod
+
+import pygame
+
+from .config import config
+
+
+class GameClock(ABC):
+    """The time of the game, in milliseconds
+
+    Attributes:
+        rate (float): How fast the time of the game runs compared to the real time, used by the
+            game loop to know how many ticks to simulate.
+    """
+
+    rate = 1.0
+
+    @abstractmethod
+    def get_ticks(self) -> int:
+        """Returns the time of the game
+
+        Returns:
+            int: The number of milliseconds elapsed in the game.
+        """
+
+    def step(self) -> None:
+        """Called by the level at the beginning of each simulation tick"""
+
+
+class RealTimeClock(GameClock):
+    """The real time, as given by `pygame.time.get_ticks`"""
+
+    def get_ticks(self) -> int:
+        return pygame.time.get_ticks()
+
+
+class SteppedClock(GameClock):
+    """A clock only moving forward when stepped, by a fixed duration per simulation tick
+
+    Attributes:
+        tick_duration (float): The duration of a simulation tick in milliseconds.
+    """
+
+    def __init__(self, tick_duration: float = 1000 / config.tick_rate, start: float = 0) -> None:
+        """Initializes the SteppedClock class
+
+        Args:
+            tick_duration (float, optional): The duration of a simulation tick in milliseconds.
+                Defaults to 1000 / config.tick_rate.
+            start (float, optional): The initial time in milliseconds. Defaults to 0.
+        """
+        self.tick_duration = tick_duration
+        self._time = start
+
+    def get_ticks(self) -> int:
+        return int(self._time)
+
+    def step(self) -> None:
+        """Moves the time one simulation tick forward"""
+        self._time += self.tick_duration
+
+    def advance(self, milliseconds: float) -> None:
+        """Moves the time forward by an arbitrary duration
+
+        Args:
+            milliseconds (float): The duration to move forward.
+        """
+        self._time += milliseconds
+
+
+class ScaledClock(SteppedClock):
+    """A stepped clock whose simulation runs faster or slower than real time by a factor
+
+    The game loop simulates `rate` times more ticks per second, each tick standing for
+    `tick_duration / rate` milliseconds of real time and moving the clock forward by `rate` times
+    that, a full tick. The timers thus stay in step with the movements, even when the loop drops
+    ticks to catch up with a slow frame or when the ticks are simulated as fast as possible.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            tick_duration: float = 1000 / config.tick_rate,
+            start: float = 0
+        ) -> None:
+        """Initializes the ScaledClock class
+
+        Args:
+            rate (float): The speed factor, e.g. 10 for a game running ten times faster.
+            tick_duration (float, optional): The duration of a simulation tick in milliseconds.
+                Defaults to 1000 / config.tick_rate.
+            start (float, optional): The initial time in milliseconds. Defaults to 0.
+        """
+        super().__init__(tick_duration, start)
+        self.rate = rate
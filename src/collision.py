@@ -0,0 +1,160 @@
+"""Tile resolution collision grid used by the moving entities"""
+from __future__ import absolute_import
+
+from array import array
+from typing import Dict, Iterator, List
+
+import pygame
+
+from .config import config
+
+
+class CollisionGrid(pygame.sprite.Group):
+    """A sprite group indexing the obstacles hitboxes on a tile grid
+
+    Every obstacle is registered in each cell its hitbox overlaps. The number of obstacles per cell
+    is kept in a compact occupancy array so that a query only looks at the few cells covered by the
+    hitbox of the moving entity, and skip the empty ones without any dictionary lookup.
+
+    Since the grid is a sprite group, killing a sprite (e.g. cutting grass) removes it from the grid
+    as well and the collisions stay correct.
+
+    The static tiles of a `TileLayer` are not sprites, only their count is kept per cell, the layer
+    building their hitboxes when an entity gets close to them.
+
+    Attributes:
+        cols (int): The number of columns of the grid.
+        rows (int): The number of rows of the grid.
+        occupancy (array): The number of obstacles in each cell, indexed by `row * cols + col`.
+        static_occupancy (array): The number of static tiles in each cell, included in occupancy.
+        version (int): Incremented each time an obstacle is added or removed.
+        tiles (Optional[TileLayer]): The layer of the static tiles, set by the layer.
+    """
+
+    def __init__(self, cols: int, rows: int, tilesize: int = config.tilesize) -> None:
+        """Initializes the CollisionGrid class
+
+        Args:
+            cols (int): The number of columns of the map.
+            rows (int): The number of rows of the map.
+            tilesize (int, optional): The size of a cell in pixels. Defaults to config.tilesize.
+        """
+        super().__init__()
+
+        self.cols = cols
+        self.rows = rows
+        self.tilesize = tilesize
+
+        self.occupancy = array('H', bytes(2 * cols * rows))
+        self.static_occupancy = array('H', bytes(2 * cols * rows))
+        self.version = 0
+        self.tiles = None
+        self._cells: Dict[int, List[pygame.sprite.Sprite]] = {}
+        self._sprite_cells: Dict[pygame.sprite.Sprite, List[int]] = {}
+
+    def _cell_range(self, rect: pygame.Rect) -> Iterator[int]:
+        """Yields the indexes of the cells overlapped by a rectangle, clamped to the grid"""
+        col_start = max(rect.left // self.tilesize, 0)
+        col_end = min((rect.right - 1) // self.tilesize, self.cols - 1)
+        row_start = max(rect.top // self.tilesize, 0)
+        row_end = min((rect.bottom - 1) // self.tilesize, self.rows - 1)
+
+        for row in range(row_start, row_end + 1):
+            offset = row * self.cols
+            for col in range(col_start, col_end + 1):
+                yield offset + col
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None) -> None:
+        """Registers the sprite in the group and in every cell covered by its hitbox"""
+        super().add_internal(sprite, layer)
+
+        cells = list(self._cell_range(sprite.hitbox))
+        self.version += 1
+        for cell in cells:
+            self.occupancy[cell] += 1
+            self._cells.setdefault(cell, []).append(sprite)
+        self._sprite_cells[sprite] = cells
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        """Removes the sprite from the group and from the cells it was registered in"""
+        super().remove_internal(sprite)
+        self.version += 1
+
+        for cell in self._sprite_cells.pop(sprite, ()):
+            self.occupancy[cell] -= 1
+            occupants = self._cells[cell]
+            occupants.remove(sprite)
+            if not occupants:
+                del self._cells[cell]
+
+    def add_static(self, hitbox: pygame.Rect) -> None:
+        """Counts the hitbox of a static tile in the cells it overlaps
+
+        Args:
+            hitbox (pygame.Rect): The hitbox of the tile.
+        """
+        self.version += 1
+        for cell in self._cell_range(hitbox):
+            self.occupancy[cell] += 1
+            self.static_occupancy[cell] += 1
+
+    def remove_static(self, hitbox: pygame.Rect) -> None:
+        """Uncounts the hitbox of a static tile from the cells it overlaps
+
+        Args:
+            hitbox (pygame.Rect): The hitbox of the tile.
+        """
+        self.version += 1
+        for cell in self._cell_range(hitbox):
+            self.occupancy[cell] -= 1
+            self.static_occupancy[cell] -= 1
+
+    def candidates(self, rect: pygame.Rect) -> List[pygame.sprite.Sprite]:
+        """Returns the obstacles registered in the cells overlapped by a rectangle
+
+        Args:
+            rect (pygame.Rect): The rectangle to query, usually the hitbox of an entity.
+
+        Returns:
+            List[pygame.sprite.Sprite]: The obstacles near the rectangle, without duplicates.
+        """
+        found = {}
+        for cell in self._cell_range(rect):
+            if self.occupancy[cell]:
+                for sprite in self._cells.get(cell, ()):
+                    found[sprite] = None
+
+        return list(found)
+
+    def hitboxes(self, rect: pygame.Rect) -> List[pygame.Rect]:
+        """Returns the hitboxes of the obstacles registered in the cells overlapped by a rectangle
+
+        Args:
+            rect (pygame.Rect): The rectangle to query, usually the hitbox of an entity.
+
+        Returns:
+            List[pygame.Rect]: The hitboxes of the obstacle sprites and static tiles near the
+                rectangle.
+        """
+        found = {}
+        static = False
+        for cell in self._cell_range(rect):
+            if self.occupancy[cell]:
+                static = static or self.static_occupancy[cell] > 0
+                for sprite in self._cells.get(cell, ()):
+                    found[sprite] = None
+
+        hitboxes = [sprite.hitbox for sprite in found]
+        if static:
+            # The tiles overlapping the cells, as the sprites registered in them
+            size = self.tilesize
+            left, top = rect.left // size * size, rect.top // size * size
+            area = pygame.Rect(
+                left,
+                top,
+                (rect.right - 1) // size * size + size - left,
+                (rect.bottom - 1) // size * size + size - top
+            )
+            hitboxes.extend(self.tiles.hitboxes(area))
+
+        return hitboxes
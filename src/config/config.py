@@ -14,6 +14,15 @@ class Configuration:
     height = 720
     tilesize = 64
 
+    # Map config
+    map_layers = {
+        'boundary': 'lib/data/map_FloorBlocks.csv',
+        'grass': 'lib/data/map_Grass.csv',
+        'object': 'lib/data/map_Objects.csv',
+        'entities': 'lib/data/map_Entities.csv'
+    }
+    compiled_map_path = 'lib/data/map.bin'
+
     # colors
     water_color = '#71ddee'
     ui_bg_color = '#222222'
@@ -23,8 +32,73 @@ class Configuration:
     energy_color = 'blue'
     ui_border_color_active = 'gold'
 
-    # Time config
+    # Camera config
+    camera_cell_size = 256
+    camera_margin = 64
+
+    # Attack config, the attackable sprites are indexed in cells of attack_cell_size pixels
+    attack_cell_size = 128
+
+    # Floor config, the floor image is cut in chunks of floor_chunk_size pixels
+    floor_path = 'lib/images/tilemap/ground.png'
+    floor_cache_path = 'lib/images/tilemap/ground_chunks'
+    floor_chunk_size = 512
+    floor_max_chunks = 24
+
+    # Tiles config, the boundary, grass and object tiles are kept in compact arrays, not as sprites
+    compact_tiles = True
+
+    # Streaming config, the map is built by chunks of chunk_size tiles around the camera
+    streaming = False
+    chunk_size = 16
+    chunk_load_margin = 512
+    chunk_unload_margin = 1024
+    chunk_lookahead = 384
+    chunk_build_budget = 1
+
+    # Atlas config
+    atlas_page_size = 1024
+
+    # Entity store config, the enemies are moved and updated in batch (requires numpy)
+    entity_store = False
+    entity_store_capacity = 256
+
+    # Particles config, the particle effects are updated and drawn in batch (requires numpy)
+    batched_particles = False
+    particle_capacity = 1024
+
+    # Animations config, the animations likely needed soon are loaded ahead of their first use, a
+    # tick loading queued animations until animation_prefetch_frames frames were loaded
+    animation_prefetch_frames = 12
+
+    # Pool config, the most killed weapons and particle effects kept to be reused
+    weapon_pool_size = 4
+    particle_pool_size = 256
+
+    # Pathfinding config, the enemies follow a flow field computed from the player tile
+    flow_field = True
+
+    # AI scheduling config, the enemies far from the player are updated less often or not at all
+    ai_scheduling = True
+    ai_wake_margin = 128
+    ai_sleep_distance = 1600
+    ai_reduced_interval = 4
+    ai_schedule_interval = 10
+
+    # Time config, the simulation runs at a fixed tick rate and the rendering at up to fps frames
+    # per second. After a slow frame at most max_catch_up_ticks ticks are run, the remaining time is
+    # dropped and the game slows down instead of falling further behind.
     fps = 60
+    tick_rate = 60
+    max_catch_up_ticks = 5
+    render_interpolation = False
+
+    # Profiler config, the overlay key shows the timings of the phases of the frames and the trace
+    # key starts and stops recording them to the trace file (.csv or .json)
+    profiler_window = 120
+    profiler_overlay_key = pygame.K_F3
+    profiler_trace_key = pygame.K_F4
+    profiler_trace_path = 'profile_trace.csv'
 
     # Entity config
     animation_speed = 0.15
@@ -43,6 +117,12 @@ class Configuration:
     }
     switch_duration_cooldown = 200
     player_tile_id = '394'
+    monster_tile_ids = {
+        '390': 'bamboo',
+        '391': 'spirit',
+        '392': 'raccoon',
+        '393': 'squid'
+    }
 
     # Weapons config
     weapon_data = {
@@ -1,18 +1,30 @@
 """docstring"""
 from __future__ import absolute_import
 
-from typing import Callable ,List, Tuple
+from typing import Callable ,List, Optional, Tuple
 
 import pygame
 
+from .clock import GameClock
 from .config import config
-from .entity import Entity
+from .entity import INVISIBLE, Entity
+from .entity_store import STATUS_CODES, STATUSES
+from .pathfinding import FlowField
 from .player import Player
-from .utils.utils import import_image_from_folder
+from .utils.assets import assets
+from .utils.atlas import frame_rect
+from .utils.utils import import_frames_from_folder
 
 
 class Enemy(Entity):
-    """Class representing an enemy entity"""
+    """Class representing an enemy entity
+
+    When attached to an entity store, the direction, status and attack readiness of the enemy live
+    in the arrays of the store, which moves the enemy and updates its status in batch.
+    """
+
+    store = None
+    slot = None
 
     def __init__(
             self,
@@ -20,7 +32,10 @@ class Enemy(Entity):
             pos: Tuple[int, int],
             groups: List[pygame.sprite.Group],
             obstacles: pygame.sprite.Group,
-            damage: Callable
+            damage: Callable,
+            store: Optional[object] = None,
+            flow_field: Optional[FlowField] = None,
+            clock: Optional[GameClock] = None
         ) -> None:
         """Intitialise an Enemy object
 
@@ -30,8 +45,13 @@ class Enemy(Entity):
             groups (List[pygame.sprite.Group]): List of the sprite groups the enemy belongs to
             obstacles (pygame.sprite.Group): Sprite groupe containing obstacles the enemy can
                 collide to
+            damage (Callable): Function applying the damage of the enemy attacks to the player
+            store (EnemyStore, optional): The entity store to attach the enemy to. Defaults to None.
+            flow_field (FlowField, optional): The flow field followed to reach the player. Defaults
+                to None, the enemy heading straight for the player.
+            clock (GameClock, optional): The clock of the cooldowns. Defaults to the real time.
         """
-        super().__init__(groups)
+        super().__init__(groups, clock)
 
         # General setup
         self.sprite_type = 'enemy'
@@ -42,9 +62,10 @@ class Enemy(Entity):
         self.image = self.animations[self.status][self.frame_index]
 
         # Movements
-        self.rect = self.image.get_rect(topleft = pos)
+        self.rect = frame_rect(self.image, topleft=pos)
         self.hitbox = self.rect.inflate(0, -10)
         self.obstacles_sprite = obstacles
+        self.flow_field = flow_field
 
         # Stats
         self.monster_name = monster_name
@@ -69,6 +90,64 @@ class Enemy(Entity):
         self.hit_time = None
         self.invincibility_duration = monster_info['invincibility_duration']
 
+        # Entity store
+        if store is not None:
+            self.slot = store.add(self)
+            self.store = store
+
+    @property
+    def direction(self) -> pygame.math.Vector2:
+        """The direction of the enemy, a copy of the store row when attached to a store"""
+        if self.store is None:
+            return self._direction
+        return pygame.math.Vector2(*self.store.direction[self.slot])
+
+    @direction.setter
+    def direction(self, value: pygame.math.Vector2) -> None:
+        if self.store is None:
+            self._direction = value
+        else:
+            self.store.direction[self.slot] = tuple(value)
+
+    @property
+    def status(self) -> str:
+        """The status of the enemy ('idle', 'move' or 'attack')"""
+        if self.store is None:
+            return self._status
+        return STATUSES[self.store.status[self.slot]]
+
+    @status.setter
+    def status(self, value: str) -> None:
+        if self.store is None:
+            self._status = value
+        else:
+            self.store.status[self.slot] = STATUS_CODES[value]
+
+    @property
+    def can_attack(self) -> bool:
+        """Whether the enemy attack cooldown is over"""
+        if self.store is None:
+            return self._can_attack
+        return bool(self.store.can_attack[self.slot])
+
+    @can_attack.setter
+    def can_attack(self, value: bool) -> None:
+        if self.store is None:
+            self._can_attack = value
+        else:
+            self.store.can_attack[self.slot] = value
+
+    def place(self, center: Tuple[int, int]) -> None:
+        """Moves the enemy to a position, outside of its regular movement
+
+        Args:
+            center (Tuple[int, int]): The new center of the enemy hitbox.
+        """
+        self.hitbox.center = center
+        self.rect.center = center
+        if self.store is not None:
+            self.store.place(self.slot, self.hitbox)
+
     def _import_graphics(self, name: str) -> None:
         """Import graphics for the different enemy animations
 
@@ -82,8 +161,10 @@ class Enemy(Entity):
         }
         main_path = f'lib/images/monsters/{name}/'
 
+        self.animation_paths = [main_path + animation for animation in self.animations]
+
         for animation in self.animations:
-            self.animations[animation] = import_image_from_folder(main_path + animation)
+            self.animations[animation] = import_frames_from_folder(main_path + animation)
 
     def _get_status(self, player: Player) -> None:
         """Determine the status of the enemy based on player distance
@@ -130,10 +211,13 @@ class Enemy(Entity):
             player (Player): The player object
         """
         if self.status == 'attack':
-            self.attack_time = pygame.time.get_ticks()
+            self.attack_time = self.clock.get_ticks()
             self.damage_player(self.attack_damage, self.attack_type)
         elif self.status == 'move':
-            _, self.direction = self._get_player_distance_direction(player)
+            if self.flow_field is None:
+                _, self.direction = self._get_player_distance_direction(player)
+            else:
+                self.direction = self.flow_field.direction(self.hitbox.center, player.rect.center)
         else:
             self.direction = pygame.math.Vector2()
 
@@ -153,15 +237,11 @@ class Enemy(Entity):
                 self.can_attack = False
             self.frame_index = 0
 
-        self.image = animation[int(self.frame_index)]
-        self.rect = self.image.get_rect(center=self.hitbox.center)
+        frame = animation[int(self.frame_index)]
+        self.rect = frame_rect(frame, center=self.hitbox.center)
 
-        # Flicker if hit
-        if not self.vulnerable:
-            alpha = self._wave_value()
-            self.image.set_alpha(alpha)
-        else:
-            self.image.set_alpha(255)
+        # Flicker if hit, by drawing nothing instead of the shared frame
+        self.image = frame if self.vulnerable or self._wave_value() else INVISIBLE
 
     def _cooldowns(self) -> None:
         """Manages cooldowns for the enemy
@@ -170,7 +250,7 @@ class Enemy(Entity):
         ensures that the enemy can attack again after a specified cooldown period and becomes
         vulnerable again after a certain invincibility duration.
         """
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if not self.can_attack:
             if current_time - self.attack_time >= self.attack_cooldown:
                 self.can_attack = True
@@ -179,6 +259,22 @@ class Enemy(Entity):
             if current_time - self.hit_time >= self.invincibility_duration:
                 self.vulnerable = True
 
+    def kill(self) -> None:
+        """Removes the enemy from its groups and releases its shared animations"""
+        for path in self.animation_paths:
+            assets.release(path, frames=True)
+        self.animation_paths = []
+
+        if self.store is not None:
+            # Keeping the last state on the sprite once detached
+            self._direction = self.direction
+            self._status = self.status
+            self._can_attack = self.can_attack
+            self.store.remove(self.slot)
+            self.store = None
+
+        super().kill()
+
     def _check_death(self) -> None:
         """Check if the enemy is dead according to his current health"""
         if self.health <= 0:
@@ -206,13 +302,17 @@ class Enemy(Entity):
                 self.health -= player.get_full_weapon_damage()
             else:
                 pass  # Magic damage
-            self.hit_time = pygame.time.get_ticks()
+            self.hit_time = self.clock.get_ticks()
             self.vulnerable = False
 
     def update(self) -> None:
-        """Updates the sprite's movement, animation, cooldowns, and checks for death"""
+        """Updates the sprite's movement, animation, cooldowns, and checks for death
+
+        The enemies attached to a store are moved by the store, in batch.
+        """
         self._hit_reaction()
-        self._move(self.speed)
+        if self.store is None:
+            self._move(self.speed)
         self._animate()
         self._cooldowns()
         self._check_death()
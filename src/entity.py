@@ -1,21 +1,38 @@
 """Docstring"""
 from __future__ import absolute_import
 
-from typing import List
+from typing import List, Optional
 
 from math import sin
 
 import pygame
 
+from src.clock import GameClock, RealTimeClock
 from src.config import config
 
 
+# Drawn instead of the frame of a flickering entity, blitting nothing
+INVISIBLE = pygame.Surface((0, 0))
+
 class Entity(pygame.sprite.Sprite):
     """Docstring"""
 
-    def __init__(self, groups: List[pygame.sprite.Group]) -> None:
+    def __init__(
+            self,
+            groups: List[pygame.sprite.Group],
+            clock: Optional[GameClock] = None
+        ) -> None:
+        """Initializes the Entity class
+
+        Args:
+            groups (List[pygame.sprite.Group]): List of sprite groups to add the entity to.
+            clock (GameClock, optional): The clock the timers of the entity read the time from.
+                Defaults to the real time.
+        """
         super().__init__(groups)
 
+        self.clock = clock or RealTimeClock()
+
         self.frame_index =config.frame_index
         self.animation_speed = config.animation_speed
         self.direction = pygame.math.Vector2()
@@ -44,31 +61,34 @@ class Entity(pygame.sprite.Sprite):
         """Handles collision detection and response for the player's hitbox
 
         Checks for collisions in the specified direction (horizontal or vertical) with obstacles
-        represented by sprites in the obstacles_sprite group. Adjusts the player's hitbox position
-        based on the detected collisions to prevent overlapping with obstacles.
+        represented by sprites or static tiles in the obstacles_sprite grid. Only the obstacles
+        registered in the cells overlapped by the hitbox are tested. Adjusts the player's hitbox
+        position based on the detected collisions to prevent overlapping with obstacles.
 
         Args:
             direction (str): The direction in which collision detection is performed ('horizontal'
             or 'vertical').
         """
+        obstacles = self.obstacles_sprite.hitboxes(self.hitbox)
+
         if direction == 'horizontal':
-            for sprite in self.obstacles_sprite:
-                if sprite.hitbox.colliderect(self.hitbox):
+            for hitbox in obstacles:
+                if hitbox.colliderect(self.hitbox):
                     if self.direction.x >= 0:
-                        self.hitbox.right = sprite.hitbox.left
+                        self.hitbox.right = hitbox.left
                     if self.direction.x <= 0:
-                        self.hitbox.left = sprite.hitbox.right
+                        self.hitbox.left = hitbox.right
 
         if direction == 'vertical':
-            for sprite in self.obstacles_sprite:
-                if sprite.hitbox.colliderect(self.hitbox):
+            for hitbox in obstacles:
+                if hitbox.colliderect(self.hitbox):
                     if self.direction.y >= 0:
-                        self.hitbox.bottom = sprite.hitbox.top
+                        self.hitbox.bottom = hitbox.top
                     if self.direction.y <= 0:
-                        self.hitbox.top = sprite.hitbox.bottom
+                        self.hitbox.top = hitbox.bottom
 
     def _wave_value(self) -> int:
-        value = sin(pygame.time.get_ticks())
+        value = sin(self.clock.get_ticks())
         if value >= 0:
             return 255
         return 0
@@ -0,0 +1,373 @@
+"""Structure-of-arrays store running the enemies movement and AI checks as batch operations
+
+The store keeps the hitboxes, directions, speeds, radii and statuses of all the enemies in
+contiguous NumPy arrays. The enemy sprites attached to it read their direction, status and attack
+readiness from the arrays and are otherwise only used for animation and rendering.
+
+Each frame:
+    - `move` normalizes and integrates every direction at once. The enemies whose swept hitbox only
+      overlaps empty cells of the collision grid are moved without any per-sprite collision test,
+      the others go through the regular axis by axis collision response.
+    - `update` computes the distance and direction to the player of every enemy at once, then
+      derives their status and direction, read from the flow field when there is one. Only the
+      attacking enemies call back into Python, in the order the enemies were added, which is the
+      order the sprite groups update them in.
+
+The enemies resting this frame, according to the activity scheduler, are neither moved nor updated,
+as in the default path. The batch move runs after the update of the sprites rather than within it,
+which changes nothing as the enemies only collide with the obstacles: a run with the store ends in
+the same state as without it, as checked by `python -m src.benchmarks.scenarios --check-store`.
+
+NumPy is an optional dependency, only needed when `config.entity_store` is enabled.
+"""
+from __future__ import absolute_import
+
+from typing import AbstractSet, List, Optional, Tuple
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only required by the entity store
+    np = None
+
+from .clock import GameClock, RealTimeClock
+from .collision import CollisionGrid
+from .config import config
+from .pathfinding import FlowField
+
+
+STATUSES = ('idle', 'move', 'attack')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+IDLE, MOVE, ATTACK = range(len(STATUSES))
+
+
+def _round_like_rect(values: 'np.ndarray') -> 'np.ndarray':
+    """Rounds coordinates half away from zero, as pygame does when a float is set on a Rect"""
+    return np.trunc(values + np.copysign(0.5, values))
+
+
+class EnemyStore:
+    """Contiguous arrays of the enemies state, indexed by slot
+
+    Attributes:
+        obstacles (CollisionGrid): The collision grid the enemies collide with.
+        flow_field (Optional[FlowField]): The flow field the moving enemies follow.
+        clock (GameClock): The clock of the attack times.
+        sprites (List[Optional[pygame.sprite.Sprite]]): The enemy attached to each slot, None for
+            the free slots.
+        hitbox (np.ndarray): The hitboxes (x, y, width, height) of the enemies.
+        direction (np.ndarray): The directions (x, y) of the enemies.
+        speed (np.ndarray): The speeds of the enemies.
+        attack_radius (np.ndarray): The attack radiuses of the enemies.
+        notice_radius (np.ndarray): The notice radiuses of the enemies.
+        status (np.ndarray): The status codes of the enemies, see STATUSES.
+        can_attack (np.ndarray): Whether each enemy can attack.
+        alive (np.ndarray): Whether each slot is used.
+        order (np.ndarray): The rank of each enemy in the order they were added, the slots being
+            reused.
+    """
+
+    def __init__(
+            self,
+            obstacles: CollisionGrid,
+            capacity: int = config.entity_store_capacity,
+            flow_field: Optional[FlowField] = None,
+            clock: Optional[GameClock] = None
+        ) -> None:
+        """Initializes the EnemyStore class
+
+        Args:
+            obstacles (CollisionGrid): The collision grid the enemies collide with.
+            capacity (int, optional): The initial number of slots, the arrays grow as needed.
+                Defaults to config.entity_store_capacity.
+            flow_field (FlowField, optional): The flow field the moving enemies follow. Defaults to
+                None, the enemies heading straight for the player.
+            clock (GameClock, optional): The clock of the attack times. Defaults to the real time.
+
+        Raises:
+            ImportError: If numpy is not installed.
+        """
+        if np is None:
+            raise ImportError('The entity store requires numpy')
+
+        self.obstacles = obstacles
+        self.flow_field = flow_field
+        self.clock = clock or RealTimeClock()
+        self.sprites: List[Optional[pygame.sprite.Sprite]] = []
+        self._free: List[int] = []
+        self._added = 0
+
+        self.hitbox = np.zeros((capacity, 4), dtype=np.int64)
+        self.direction = np.zeros((capacity, 2), dtype=np.float64)
+        self.speed = np.zeros(capacity, dtype=np.float64)
+        self.attack_radius = np.zeros(capacity, dtype=np.float64)
+        self.notice_radius = np.zeros(capacity, dtype=np.float64)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.can_attack = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.order = np.zeros(capacity, dtype=np.int64)
+
+        # Summed-area table of the collision grid occupancy, rebuilt when the grid changes
+        self._occupancy_version = None
+        self._occupancy_table = None
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def _grow(self) -> None:
+        """Doubles the capacity of the arrays"""
+        for name in (
+                'hitbox', 'direction', 'speed', 'attack_radius', 'notice_radius', 'status',
+                'can_attack', 'alive', 'order'
+            ):
+            array = getattr(self, name)
+            grown = np.zeros((max(len(array), 1) * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, enemy: pygame.sprite.Sprite) -> int:
+        """Attaches an enemy to a free slot, copying its current state in the arrays
+
+        Args:
+            enemy (pygame.sprite.Sprite): The enemy to attach.
+
+        Returns:
+            int: The slot of the enemy.
+        """
+        if self._free:
+            slot = self._free.pop()
+            self.sprites[slot] = enemy
+        else:
+            slot = len(self.sprites)
+            if slot >= len(self.alive):
+                self._grow()
+            self.sprites.append(enemy)
+
+        self.hitbox[slot] = tuple(enemy.hitbox)
+        self.direction[slot] = tuple(enemy.direction)
+        self.speed[slot] = enemy.speed
+        self.attack_radius[slot] = enemy.attack_radius
+        self.notice_radius[slot] = enemy.notice_radius
+        self.status[slot] = STATUS_CODES[enemy.status]
+        self.can_attack[slot] = enemy.can_attack
+        self.alive[slot] = True
+        self.order[slot] = self._added
+        self._added += 1
+
+        return slot
+
+    def remove(self, slot: int) -> None:
+        """Frees the slot of an enemy
+
+        Args:
+            slot (int): The slot of the enemy.
+        """
+        self.sprites[slot] = None
+        self.alive[slot] = False
+        self.direction[slot] = 0
+        self._free.append(slot)
+
+    def place(self, slot: int, hitbox: pygame.Rect) -> None:
+        """Copies the hitbox of an enemy moved outside of the store in the arrays
+
+        Args:
+            slot (int): The slot of the enemy.
+            hitbox (pygame.Rect): The new hitbox of the enemy.
+        """
+        self.hitbox[slot] = tuple(hitbox)
+
+    def _occupancy(self) -> 'np.ndarray':
+        """Returns the summed-area table of the collision grid occupancy"""
+        if self._occupancy_version != self.obstacles.version:
+            grid = np.frombuffer(self.obstacles.occupancy, dtype=np.uint16).reshape(
+                self.obstacles.rows, self.obstacles.cols
+            )
+            table = np.zeros((self.obstacles.rows + 1, self.obstacles.cols + 1), dtype=np.int64)
+            table[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+            self._occupancy_table = table
+            self._occupancy_version = self.obstacles.version
+
+        return self._occupancy_table
+
+    def _free_of_obstacles(self, left, top, right, bottom) -> 'np.ndarray':
+        """Checks that the cells overlapped by pixel rectangles hold no obstacle"""
+        tilesize = self.obstacles.tilesize
+        col_start = np.clip(left // tilesize, 0, self.obstacles.cols)
+        col_end = np.clip((right - 1) // tilesize + 1, 0, self.obstacles.cols)
+        row_start = np.clip(top // tilesize, 0, self.obstacles.rows)
+        row_end = np.clip((bottom - 1) // tilesize + 1, 0, self.obstacles.rows)
+
+        table = self._occupancy()
+        count = table[row_end, col_end] - table[row_start, col_end] - \
+            table[row_end, col_start] + table[row_start, col_start]
+        empty_range = (col_start >= col_end) | (row_start >= row_end)
+
+        return empty_range | (count == 0)
+
+    def _active(self, resting: AbstractSet[pygame.sprite.Sprite]) -> 'np.ndarray':
+        """Returns whether each slot holds an enemy not resting this frame"""
+        active = self.alive[:len(self.sprites)].copy()
+        for sprite in resting:
+            if getattr(sprite, 'store', None) is self:
+                active[sprite.slot] = False
+
+        return active
+
+    def move(self, resting: AbstractSet[pygame.sprite.Sprite] = frozenset()) -> None:
+        """Normalizes, integrates and resolves the collisions of every enemy direction
+
+        As `Entity._move`, the collision response also applies to the enemies standing still, which
+        get pushed out of the obstacles they overlap.
+
+        Args:
+            resting (AbstractSet[pygame.sprite.Sprite], optional): The enemies not to move this
+                frame. Defaults to none.
+        """
+        count = len(self.sprites)
+        active = self._active(resting)
+        slots = np.flatnonzero(active)
+        if not len(slots):
+            return
+
+        direction = self.direction[:count]
+        norm = np.hypot(direction[:, 0], direction[:, 1])
+        nonzero = active & (norm != 0)
+        direction[nonzero] /= norm[nonzero, None]
+
+        hitbox = self.hitbox[slots]
+        delta = direction[slots] * self.speed[slots, None]
+        target = _round_like_rect(hitbox[:, :2] + delta).astype(np.int64)
+
+        # The swept area of each hitbox, no obstacle in it means no collision on either axis
+        free = self._free_of_obstacles(
+            np.minimum(hitbox[:, 0], target[:, 0]),
+            np.minimum(hitbox[:, 1], target[:, 1]),
+            np.maximum(hitbox[:, 0], target[:, 0]) + hitbox[:, 2],
+            np.maximum(hitbox[:, 1], target[:, 1]) + hitbox[:, 3]
+        )
+        moved = slots[free & (target != hitbox[:, :2]).any(axis=1)]
+        self.hitbox[slots[free], :2] = target[free]
+
+        # The enemies near obstacles go through the regular collision response
+        blocked = slots[~free]
+        for slot in blocked:
+            enemy = self.sprites[slot]
+            enemy.hitbox.x += direction[slot, 0] * self.speed[slot]
+            enemy._collision('horizontal')
+            enemy.hitbox.y += direction[slot, 1] * self.speed[slot]
+            enemy._collision('vertical')
+            self.hitbox[slot] = tuple(enemy.hitbox)
+
+        # Syncing the sprites of the enemies that moved
+        for slot in np.concatenate((moved, blocked)):
+            enemy = self.sprites[slot]
+            enemy.hitbox.topleft = self.hitbox[slot, :2]
+            enemy.rect.center = enemy.hitbox.center
+
+    def player_distance_direction(self, player: pygame.sprite.Sprite) -> Tuple[
+            'np.ndarray', 'np.ndarray']:
+        """Computes the distance and direction to the player of every slot
+
+        Args:
+            player (pygame.sprite.Sprite): The player.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The distances and the normalized directions.
+        """
+        hitbox = self.hitbox[:len(self.sprites)]
+        centers = hitbox[:, :2] + hitbox[:, 2:] // 2
+        offset = np.asarray(player.rect.center, dtype=np.float64) - centers
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+
+        direction = np.zeros_like(offset)
+        positive = distance > 0
+        direction[positive] = offset[positive] / distance[positive, None]
+
+        return distance, direction
+
+    def flow_directions(self, player_direction: 'np.ndarray') -> 'np.ndarray':
+        """Reads the direction of every slot from the flow field
+
+        Batch equivalent of `FlowField.direction`.
+
+        Args:
+            player_direction (np.ndarray): The normalized directions to the player, kept for the
+                slots on the player tile or out of the field.
+
+        Returns:
+            np.ndarray: The normalized directions to the center of the next tile of the field.
+        """
+        field = self.flow_field
+        cols, rows, tilesize = field.obstacles.cols, field.obstacles.rows, field.obstacles.tilesize
+
+        hitbox = self.hitbox[:len(self.sprites)]
+        centers = hitbox[:, :2] + hitbox[:, 2:] // 2
+        col = centers[:, 0] // tilesize
+        row = centers[:, 1] // tilesize
+        inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+        cells = np.where(inside, row * cols + col, 0)
+
+        stamps = np.frombuffer(field.stamps, dtype=np.uint32)
+        parents = np.frombuffer(field.parents, dtype=np.int32)
+        in_field = inside & (stamps[cells] == field.generation) & (cells != field.origin)
+
+        parent = parents[cells]
+        offset = np.stack((
+            (parent % cols + 0.5) * tilesize - centers[:, 0],
+            (parent // cols + 0.5) * tilesize - centers[:, 1]
+        ), axis=1)
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+
+        # The next tile never contains the position, its center is never at a null distance
+        direction = player_direction.copy()
+        direction[in_field] = offset[in_field] / distance[in_field, None]
+
+        return direction
+
+    def update(
+            self,
+            player: pygame.sprite.Sprite,
+            resting: AbstractSet[pygame.sprite.Sprite] = frozenset()
+        ) -> None:
+        """Updates the status and direction of every enemy according to the player
+
+        Batch equivalent of `Enemy.enemy_update`.
+
+        Args:
+            player (pygame.sprite.Sprite): The player.
+            resting (AbstractSet[pygame.sprite.Sprite], optional): The enemies not to update this
+                frame. Defaults to none.
+        """
+        count = len(self.sprites)
+        if not count:
+            return
+
+        alive = self._active(resting)
+        distance, direction = self.player_distance_direction(player)
+        if self.flow_field is not None:
+            direction = self.flow_directions(direction)
+
+        status = np.full(count, IDLE, dtype=np.int8)
+        status[distance <= self.notice_radius[:count]] = MOVE
+        status[(distance <= self.attack_radius[:count]) & self.can_attack[:count]] = ATTACK
+
+        entering_attack = alive & (status == ATTACK) & (self.status[:count] != ATTACK)
+        for slot in np.flatnonzero(entering_attack):
+            self.sprites[slot].frame_index = 0
+
+        # Moving enemies head for the player, idle ones stop and attacking ones keep their direction
+        self.status[:count] = np.where(alive, status, self.status[:count])
+        self.direction[:count] = np.where(
+            (alive & (status == MOVE))[:, None],
+            direction,
+            np.where((alive & (status == ATTACK))[:, None], self.direction[:count], 0)
+        )
+
+        # Only the first attack hitting the player counts, they run in the order of the groups
+        attackers = np.flatnonzero(alive & (status == ATTACK))
+        current_time = self.clock.get_ticks()
+        for slot in attackers[np.argsort(self.order[attackers], kind='stable')]:
+            enemy = self.sprites[slot]
+            enemy.attack_time = current_time
+            enemy.damage_player(enemy.attack_damage, enemy.attack_type)
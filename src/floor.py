@@ -0,0 +1,158 @@
+"""Chunked, viewport-clipped rendering of the floor image"""
+from __future__ import absolute_import
+
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+import pygame
+
+from .config import config
+
+
+class Floor:
+    """The floor of the level, split in square chunks loaded on demand
+
+    The first time a floor image is used (or when it changed), it is cut into chunk files stored in
+    a cache folder, indexed by a file written last and atomically. An unreadable index or a missing
+    chunk file gets the floor cut again. The chunks are then decoded lazily when they come into
+    view and kept in a least recently used cache, so the whole floor never needs to sit in memory.
+    Only the visible part of each visible chunk is blitted, through the source area of the blit.
+
+    Attributes:
+        width (int): The width of the floor in pixels.
+        height (int): The height of the floor in pixels.
+        chunk_size (int): The size of a chunk in pixels.
+    """
+
+    def __init__(
+            self,
+            path: str = config.floor_path,
+            cache_dir: str = config.floor_cache_path,
+            chunk_size: int = config.floor_chunk_size,
+            max_chunks: int = config.floor_max_chunks
+        ) -> None:
+        """Initializes the Floor class
+
+        Args:
+            path (str, optional): The path of the floor image. Defaults to config.floor_path.
+            cache_dir (str, optional): The folder of the chunk files. Defaults to
+                config.floor_cache_path.
+            chunk_size (int, optional): The size of a chunk in pixels. Defaults to
+                config.floor_chunk_size.
+            max_chunks (int, optional): The number of decoded chunks kept in memory. Defaults to
+                config.floor_max_chunks.
+        """
+        self.path = path
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+
+        self._chunks: Dict[Tuple[int, int], pygame.Surface] = OrderedDict()
+
+        index = self._load_index()
+        self.width = index['width']
+        self.height = index['height']
+
+    def _load_index(self) -> dict:
+        """Returns the index of the chunk files, cutting the floor image if it is outdated"""
+        stat = os.stat(self.path)
+        source = {
+            'source': self.path,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'chunk_size': self.chunk_size
+        }
+
+        index_path = os.path.join(self.cache_dir, 'index.json')
+        index = self._read_index(index_path)
+        if index is not None and all(index.get(key) == value for key, value in source.items()) \
+                and all(
+                    os.path.isfile(self._chunk_path(col, row))
+                    for col, row in self._chunk_cells(index['width'], index['height'])
+                ):
+            return index
+
+        return self._cut(source, index_path)
+
+    @staticmethod
+    def _read_index(index_path: str) -> Optional[dict]:
+        """Returns the index of the chunk files, None if it is missing or unreadable"""
+        try:
+            with open(index_path, encoding='utf-8') as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(index, dict) or not {'width', 'height'} <= index.keys():
+            return None
+        return index
+
+    def _chunk_cells(self, width: int, height: int) -> Iterator[Tuple[int, int]]:
+        """Yields the column and row of every chunk of a floor of the given size"""
+        for row in range(-(-height // self.chunk_size)):
+            for col in range(-(-width // self.chunk_size)):
+                yield col, row
+
+    def _cut(self, source: dict, index_path: str) -> dict:
+        """Cuts the floor image into chunk files and atomically writes their index"""
+        floor_surf = pygame.image.load(self.path)
+        width, height = floor_surf.get_size()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for col, row in self._chunk_cells(width, height):
+            area = pygame.Rect(
+                col * self.chunk_size,
+                row * self.chunk_size,
+                self.chunk_size,
+                self.chunk_size
+            ).clip(floor_surf.get_rect())
+            pygame.image.save(floor_surf.subsurface(area), self._chunk_path(col, row))
+
+        index = dict(source, width=width, height=height)
+        temp_path = f'{index_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(index, index_file)
+        os.replace(temp_path, index_path)
+
+        return index
+
+    def _chunk_path(self, col: int, row: int) -> str:
+        return os.path.join(self.cache_dir, f'{col}_{row}.png')
+
+    def _chunk(self, col: int, row: int) -> pygame.Surface:
+        """Returns a decoded chunk, loading it and evicting the least recently used if needed"""
+        key = (col, row)
+        if key in self._chunks:
+            self._chunks.move_to_end(key)
+        else:
+            self._chunks[key] = pygame.image.load(self._chunk_path(col, row)).convert()
+            if len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+
+        return self._chunks[key]
+
+    def draw(self, surface: pygame.Surface, offset: pygame.math.Vector2) -> None:
+        """Draws the part of the floor in view
+
+        Args:
+            surface (pygame.Surface): The surface to draw on.
+            offset (pygame.math.Vector2): The position of the camera on the floor.
+        """
+        view = pygame.Rect((int(offset.x), int(offset.y)), surface.get_size())
+        view = view.clip(pygame.Rect(0, 0, self.width, self.height))
+        if not view.width or not view.height:
+            return
+
+        for row in range(view.top // self.chunk_size, (view.bottom - 1) // self.chunk_size + 1):
+            for col in range(view.left // self.chunk_size, (view.right - 1) // self.chunk_size + 1):
+                chunk_pos = (col * self.chunk_size, row * self.chunk_size)
+                chunk_surf = self._chunk(col, row)
+                visible = view.clip(chunk_surf.get_rect(topleft=chunk_pos))
+
+                surface.blit(
+                    chunk_surf,
+                    (visible.x - int(offset.x), visible.y - int(offset.y)),
+                    visible.move(-chunk_pos[0], -chunk_pos[1])
+                )
@@ -0,0 +1,130 @@
+"""Sources of the player input, read once per simulation tick"""
+from __future__ import absolute_import
+
+import json
+from typing import Iterable, List, Sequence, Tuple, Union
+
+import pygame
+
+
+class PressedKeys(frozenset):
+    """A set of pressed key codes, indexable like the result of `pygame.key.get_pressed`"""
+
+    def __getitem__(self, key: int) -> bool:
+        return key in self
+
+
+NO_KEYS = PressedKeys()
+
+# The keys read by the player
+PLAYER_KEYS = (
+    pygame.K_z, pygame.K_s, pygame.K_d, pygame.K_q,
+    pygame.K_SPACE, pygame.K_a, pygame.K_LCTRL, pygame.K_e
+)
+
+
+class InputSource:
+    """The state of the keys the player is controlled with
+
+    Attributes:
+        keys (Sequence[bool]): The pressed state of each key code during the current tick.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the InputSource class, no key being pressed"""
+        self.keys: Sequence[bool] = NO_KEYS
+
+    @property
+    def finished(self) -> bool:
+        """Whether the source has no more input to give, never the case of the live sources"""
+        return False
+
+    def poll(self) -> None:
+        """Reads the state of the keys for the next tick"""
+
+
+class KeyboardInput(InputSource):
+    """The live state of the keyboard"""
+
+    def poll(self) -> None:
+        """Reads the state of the keyboard"""
+        self.keys = pygame.key.get_pressed()
+
+
+class ScriptedInput(InputSource):
+    """A scripted sequence of key presses, to run the game without a keyboard
+
+    The script is a sequence of steps, each holding keys down for a number of ticks. Once the
+    script is over, no key is pressed anymore, unless it loops.
+
+    Attributes:
+        tick (int): The number of ticks polled.
+        loop (bool): Whether the script starts over once it is over.
+    """
+
+    def __init__(
+            self,
+            script: Iterable[Tuple[int, Iterable[Union[int, str]]]],
+            loop: bool = False
+        ) -> None:
+        """Initializes the ScriptedInput class
+
+        Args:
+            script (Iterable[Tuple[int, Iterable[Union[int, str]]]]): The steps of the script, as
+                a number of ticks and the keys held during these ticks. The keys are pygame key
+                codes or names of pygame key constants without the 'K_' prefix (e.g. 'z', 'SPACE').
+            loop (bool, optional): Whether the script starts over once it is over. Defaults to
+                False.
+        """
+        super().__init__()
+
+        self._steps: List[Tuple[int, PressedKeys]] = [
+            (int(ticks), PressedKeys(self._key_code(key) for key in keys))
+            for ticks, keys in script
+        ]
+        self._total = sum(ticks for ticks, _ in self._steps)
+        self.loop = loop
+
+        self.tick = 0
+        self._step_index = 0
+        self._step_ticks = 0
+
+    @staticmethod
+    def _key_code(key: Union[int, str]) -> int:
+        return key if isinstance(key, int) else getattr(pygame, 'K_' + key)
+
+    @classmethod
+    def from_file(cls, path: str, loop: bool = False) -> 'ScriptedInput':
+        """Loads a script from a JSON file, a list of `[ticks, [key names]]` steps
+
+        Args:
+            path (str): The path of the script file.
+            loop (bool, optional): Whether the script starts over once it is over. Defaults to
+                False.
+
+        Returns:
+            ScriptedInput: The scripted input.
+        """
+        with open(path, encoding='utf-8') as script_file:
+            return cls(json.load(script_file), loop)
+
+    @property
+    def finished(self) -> bool:
+        """Whether every tick of the script was polled, never the case of a looping script"""
+        if self.loop:
+            return not self._total
+        return self.tick >= self._total
+
+    def poll(self) -> None:
+        """Moves the script one tick forward"""
+        self.tick += 1
+        if not self._total or (not self.loop and self.tick > self._total):
+            self.keys = NO_KEYS
+            return
+
+        while self._step_ticks >= self._steps[self._step_index][0]:
+            self._step_index = (self._step_index + 1) % len(self._steps)
+            self._step_ticks = 0
+
+        self.keys = self._steps[self._step_index][1]
+        self._step_ticks += 1
@@ -1,140 +1,266 @@
 """Level management class"""
 from __future__ import absolute_import
 
+import hashlib
 import random
+from itertools import count
+from typing import Optional, Tuple
 
 import pygame
 
+from .clock import GameClock, RealTimeClock
+from .collision import CollisionGrid
 from .config import config
 from .enemy import Enemy
-from .particles import AnimationPlayer
+from .entity import Entity
+from .entity_store import EnemyStore
+from .floor import Floor
+from .input import InputSource, KeyboardInput
+from .particles import AnimationPlayer, ParticleSystem
+from .pathfinding import FlowField
 from .player import Player
+from .pool import SpritePool
+from .profiler import profiler
+from .scheduler import ActivityScheduler
+from .spatial import DepthSortedGrid, SpatialGrid, SpatialGroup, merge_by_depth
+from .streaming import ChunkStreamer
 from .tile import Tile
+from .tile_layer import STYLES as TILE_STYLES, TileLayer
 from .ui import UI
-from .utils import import_csv_layout, import_image_from_folder
+from .utils import atlas, blit_batch, import_image_from_folder
+from .utils.map_compiler import load_map
 from .weapon import Weapon
 
 
 class Level:
     """Manages the level and its elements in the game"""
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            headless: bool = False,
+            input_source: Optional[InputSource] = None,
+            clock: Optional[GameClock] = None,
+            seed: Optional[int] = None
+        ) -> None:
         """Initializes the Level class
 
         Sets up the game display surface, sprite groups, configuration, and initializes the map.
+
+        Args:
+            headless (bool, optional): Whether the level runs without a display, in which case
+                it can only be updated, not drawn. Defaults to False.
+            input_source (InputSource, optional): The source of the player input. Defaults to the
+                keyboard.
+            clock (GameClock, optional): The clock of the game, handed to every entity. Defaults
+                to the real time.
+            seed (int, optional): The seed of the random choices of the level (grass graphics,
+                particles). Defaults to a random seed.
         """
         # Get the game display surface
-        self.display_surface = pygame.display.get_surface()
+        self.headless = headless
+        self.display_surface = None if headless else pygame.display.get_surface()
+        self.input_source = input_source or KeyboardInput()
+        self.clock = clock or RealTimeClock()
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
 
         # Sprite group setup
-        self.visible_sprites = YSortCameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
+        self.visible_sprites = YSortCameraGroup(headless)
+        self.obstacle_sprites = None
 
         # Config
         self.config = config
 
-        # Attack sprites
+        # Attack sprites, the weapons being recycled
         self.current_attack = None
+        self.weapon_pool = SpritePool(Weapon, config.weapon_pool_size)
         self.attack_sprites = pygame.sprite.Group()
-        self.attackable_sprites = pygame.sprite.Group()
+        self.attackable_sprites = SpatialGroup(config.attack_cell_size, moving=(Entity,))
+        self.enemy_sprites = pygame.sprite.Group()
+
+        # Scheduling of the enemies updates, only set when enabled
+        self.scheduler = ActivityScheduler(self.enemy_sprites) if config.ai_scheduling else None
+
+        # Compact storage of the static tiles, only set in compact tiles mode
+        self.tiles = None
+
+        # Map streaming, only set in streaming mode
+        self.streamer = None
+
+        # Entity store of the enemies and flow field they follow, only set when enabled
+        self.enemy_store = None
+        self.flow_field = None
+
+        # Particles, batched in a particle system when enabled, the animations of the map prefetched
+        self.particles = ParticleSystem() if config.batched_particles else None
+        self.visible_sprites.particles = self.particles
+        self.animation_player = AnimationPlayer(self.rng, self.particles)
 
         # Vars
         self._create_map()
 
-        # User Interface
-        self.user_interface = UI()
+        # User Interface, not needed without a display
+        self.user_interface = None if headless else UI()
 
-        # Particles
-        self.animation_player = AnimationPlayer()
+        # Pools statistics, shown in the profiler overlay
+        profiler.watch('weapon pool', self.weapon_pool.stats)
+        profiler.watch('effect pool', self.animation_player.effect_pool.stats)
 
     def _create_map(self) -> None:
         """Creates the game map based on imported layouts and graphics
 
-        Reads layouts from CSV files and generates tiles based on different styles (boundary, grass,
-        and object). Creates tiles according to the layout data and assigns them to corresponding
-        sprite groups.
+        Reads the layouts from the compiled map (compiled from the CSV files when missing or
+        outdated) and generates tiles based on different styles (boundary, grass, and object). Only
+        the non-empty cells are visited. Creates tiles according to the layout data and assigns them
+        to corresponding sprite groups.
+
+        The obstacles are indexed in a collision grid sized after the layouts, so that the entities
+        only test the obstacles close to them. The flow field guiding the enemies is computed on the
+        same grid.
+
+        In compact tiles mode, the boundary, grass and object tiles are stored in a tile layer
+        instead of being created as sprites.
+
+        In streaming mode, only the player is created here, the chunk streamer builds the chunks
+        around the camera as the player moves. With compact tiles, the whole tile layer is filled
+        here and only the enemies are streamed.
 
         It also initiate the Player.
         """
-        layouts = {
-            'boundary': import_csv_layout('lib/data/map_FloorBlocks.csv'),
-            'grass': import_csv_layout('lib/data/map_Grass.csv'),
-            'object': import_csv_layout('lib/data/map_Objects.csv'),
-            'entities': import_csv_layout('lib/data/map_Entities.csv')
-        }
-
-        graphics = {
+        self.graphics = {
             'grass': import_image_from_folder('lib/images/grass'),
             'objects': import_image_from_folder('lib/images/objects')
         }
 
-        for style, layout in layouts.items():
-            for row_index, row in enumerate(layout):
-                for col_index, col in enumerate(row):
-                    if col != '-1':
-                        x_pos = col_index * config.tilesize
-                        y_pos = row_index * config.tilesize
-
-                        if style == 'boundary':
-                            Tile(
-                                pos=(x_pos, y_pos),
-                                groups=[self.obstacle_sprites],
-                                sprite_type='invisible'
-                            )
-
-                        if style == 'grass':
-                            Tile(
-                                pos=(x_pos, y_pos),
-                                groups=[
-                                    self.visible_sprites,
-                                    self.obstacle_sprites,
-                                    self.attackable_sprites
-                                ],
-                                sprite_type='grass',
-                                surface=random.choice(graphics['grass'])
-                            )
-
-                        if style == 'object':
-                            Tile(
-                                pos=(x_pos, y_pos),
-                                groups=[self.visible_sprites, self.obstacle_sprites],
-                                sprite_type='object',
-                                surface=graphics['objects'][int(col)]
-                            )
-
-                        if style == 'entities':
-                            if col == config.player_tile_id:
-                                self.player = Player(
-                                    pos=(x_pos, y_pos),
-                                    groups=[self.visible_sprites],
-                                    obstacles=self.obstacle_sprites,
-                                    create_attack=self.create_attack,
-                                    destroy_attack=self.destroy_attack,
-                                    create_magic=self.create_magic
-                                )
-                            else:
-                                if col == '390':
-                                    monster_name = 'bamboo'
-                                elif col == '391':
-                                    monster_name = 'spirit'
-                                elif col == '392':
-                                    monster_name = 'raccoon'
-                                else:
-                                    monster_name = 'squid'
-                                Enemy(
-                                    monster_name=monster_name,
-                                    pos=(x_pos, y_pos),
-                                    groups=[self.visible_sprites, self.attackable_sprites],
-                                    obstacles=self.obstacle_sprites,
-                                    damage=self.damage_player
-                                )
+        with load_map(config.map_layers, config.compiled_map_path) as compiled_map:
+            self.obstacle_sprites = CollisionGrid(compiled_map.cols, compiled_map.rows)
+            if config.flow_field:
+                self.flow_field = FlowField(self.obstacle_sprites)
+            if config.entity_store:
+                self.enemy_store = EnemyStore(
+                    self.obstacle_sprites,
+                    flow_field=self.flow_field,
+                    clock=self.clock
+                )
+
+            styles = list(config.map_layers)
+            if config.compact_tiles:
+                self.tiles = TileLayer(self.obstacle_sprites)
+                self.visible_sprites.tiles = self.tiles
+                for style in TILE_STYLES:
+                    for col_index, row_index, value in compiled_map.cells(style):
+                        self._create_cell(style, col_index, row_index, value)
+                styles = [style for style in styles if style not in TILE_STYLES]
+
+            # The leaves of the grass and the death effects of the monsters of the map are likely
+            # needed soon
+            monsters = {
+                config.monster_tile_ids.get(str(value), 'squid')
+                for _, _, value in compiled_map.cells('entities')
+                if str(value) != config.player_tile_id
+            }
+            self.animation_player.prefetch(['leaf'] + sorted(monsters))
+
+            if config.streaming:
+                self.streamer = ChunkStreamer(compiled_map, self._create_cell, styles)
+            else:
+                for style in styles:
+                    for col_index, row_index, value in compiled_map.cells(style):
+                        self._create_cell(style, col_index, row_index, value)
+
+    def _create_cell(
+            self,
+            style: str,
+            col_index: int,
+            row_index: int,
+            value: int,
+            surface: Optional[pygame.Surface] = None
+        ) -> Optional[pygame.sprite.Sprite]:
+        """Creates the sprite of a non-empty map cell, or its tile in compact tiles mode
+
+        Args:
+            style (str): The layer of the cell ('boundary', 'grass', 'object' or 'entities').
+            col_index (int): The column of the cell.
+            row_index (int): The row of the cell.
+            value (int): The value of the cell in the layer.
+            surface (pygame.Surface, optional): The surface of a grass tile. Defaults to a random
+                grass graphic.
+
+        Returns:
+            Optional[pygame.sprite.Sprite]: The created tile, enemy or player, None for a tile of
+                the tile layer.
+        """
+        x_pos = col_index * config.tilesize
+        y_pos = row_index * config.tilesize
+
+        if self.tiles is not None and style in TILE_STYLES:
+            if style == 'grass':
+                surface = surface or self.rng.choice(self.graphics['grass'])
+            elif style == 'object':
+                surface = self.graphics['objects'][value]
+            self.tiles.place(style, col_index, row_index, surface)
+            return None
+
+        if style == 'boundary':
+            return Tile(
+                pos=(x_pos, y_pos),
+                groups=[self.obstacle_sprites],
+                sprite_type='invisible'
+            )
+
+        if style == 'grass':
+            return Tile(
+                pos=(x_pos, y_pos),
+                groups=[
+                    self.visible_sprites,
+                    self.obstacle_sprites,
+                    self.attackable_sprites
+                ],
+                sprite_type='grass',
+                surface=surface or self.rng.choice(self.graphics['grass'])
+            )
+
+        if style == 'object':
+            return Tile(
+                pos=(x_pos, y_pos),
+                groups=[self.visible_sprites, self.obstacle_sprites],
+                sprite_type='object',
+                surface=self.graphics['objects'][value]
+            )
+
+        if str(value) == config.player_tile_id:
+            self.player = Player(
+                pos=(x_pos, y_pos),
+                groups=[self.visible_sprites],
+                obstacles=self.obstacle_sprites,
+                create_attack=self.create_attack,
+                destroy_attack=self.destroy_attack,
+                create_magic=self.create_magic,
+                input_source=self.input_source,
+                clock=self.clock
+            )
+            return self.player
+
+        return Enemy(
+            monster_name=config.monster_tile_ids.get(str(value), 'squid'),
+            pos=(x_pos, y_pos),
+            groups=[self.visible_sprites, self.attackable_sprites, self.enemy_sprites],
+            obstacles=self.obstacle_sprites,
+            damage=self.damage_player,
+            store=self.enemy_store,
+            flow_field=self.flow_field,
+            clock=self.clock
+        )
 
     def create_attack(self) -> None:
         """Creates an attack for the player
 
-        Initiates the creation of an attack object for the player.
+        Initiates the creation of an attack object for the player, recycled from the weapon pool.
         """
-        self.current_attack = Weapon(self.player, [self.visible_sprites, self.attack_sprites])
+        self.current_attack = self.weapon_pool.acquire(
+            self.player,
+            [self.visible_sprites, self.attack_sprites]
+        )
 
     def create_magic(self, style: str, strenght: int, cost: int) -> None:
         """Create a magic attack for the player
@@ -156,88 +282,304 @@ class Level:
         if self.current_attack:
             self.current_attack.kill()
 
-    def player_attack_logic(self):
-        if self.attack_sprites:
-            for attack_sprite in self.attack_sprites:
-                collision_sprites = pygame.sprite.spritecollide(
-                    sprite=attack_sprite,
-                    group=self.attackable_sprites,
-                    dokill=False
-                )
-            if collision_sprites:
-                for target_sprite in collision_sprites:
-                    if target_sprite.sprite_type == 'grass':
-                        position = target_sprite.rect.center
-                        self.animation_player.create_grass_particles(
-                            position,
-                            [self.visible_sprites]
-                        )
-                        target_sprite.kill()
-                    else:
-                        target_sprite.get_damage(self.player, attack_sprite.sprite_type)
+    def player_attack_logic(self) -> None:
+        """Applies the hits of every attack sprite to the attackable sprites it overlaps
+
+        The grass tiles hit are cut and the enemies hit take damage. Only the attackable sprites
+        near each attack are looked at, through the spatial index of the group, and the grass of
+        the tile layer in the cells of the attack.
+        """
+        for attack_sprite in self.attack_sprites:
+            if self.tiles is not None:
+                for position in self.tiles.cut_grass(attack_sprite.rect):
+                    self.animation_player.create_grass_particles(position, [self.visible_sprites])
+
+            for target_sprite in self.attackable_sprites.collide(attack_sprite):
+                if target_sprite.sprite_type == 'grass':
+                    position = target_sprite.rect.center
+                    self.animation_player.create_grass_particles(
+                        position,
+                        [self.visible_sprites]
+                    )
+                    if self.streamer:
+                        self.streamer.mark_cut(target_sprite)
+                    target_sprite.kill()
+                else:
+                    if self.scheduler:
+                        self.scheduler.wake(target_sprite)
+                    target_sprite.get_damage(self.player, attack_sprite.sprite_type)
 
     def damage_player(self, amount, attack_type):
         if self.player.vulnerable:
             self.player.health -= amount
             self.player.vulnerable = False
-            self.player.hurt_time = pygame.time.get_ticks()
+            self.player.hurt_time = self.clock.get_ticks()
 
             # Spawn particule
 
-    def run(self) -> None:
-        """Runs the game loop, updating and drawing game elements
+    def state_digest(self) -> str:
+        """Returns a digest of the state of the world, to check that two runs ended identically
+
+        Returns:
+            str: The SHA-1 of the player and enemies state and of the number of sprites and
+                tiles.
+        """
+        state = [
+            self.clock.get_ticks(),
+            tuple(self.player.hitbox),
+            self.player.health,
+            self.player.energy,
+            self.player.status,
+            self.player.weapon_index,
+            len(self.visible_sprites),
+            len(self.obstacle_sprites),
+            len(self.attackable_sprites),
+            len(self.tiles) if self.tiles is not None else 0,
+            len(self.particles) if self.particles is not None else 0
+        ]
+        state.extend(
+            (enemy.monster_name, tuple(enemy.hitbox), enemy.health, enemy.status)
+            for enemy in self.enemy_sprites
+        )
+
+        return hashlib.sha1(repr(state).encode()).hexdigest()
 
-        Updates and draws the visible sprites in the game.
+    def update(self) -> None:
+        """Advances the simulation by one tick
+
+        Streams the chunks around the player, then updates the sprites, the enemies AI and the
+        player attacks. The enemies resting this tick, according to the activity scheduler, are
+        neither updated nor run their AI.
+
+        Each phase is timed by the profiler.
         """
-        self.visible_sprites.custom_draw(self.player)
-        self.visible_sprites.update()
-        self.visible_sprites.enemy_update(self.player)
+        self.clock.step()
+        self.input_source.poll()
+        profiler.lap('input')
+
+        if self.streamer:
+            self.streamer.update(self.player)
+            profiler.lap('streaming')
+
+        resting = self.scheduler.update(self.player) if self.scheduler else frozenset()
+        profiler.lap('scheduling')
+
+        if config.render_interpolation:
+            self.visible_sprites.snapshot()
+        self.visible_sprites.update(resting=resting)
+        if self.particles is not None:
+            self.particles.update()
+        self.animation_player.update()
+        profiler.lap('update')
+
+        if self.flow_field:
+            self.flow_field.update(self.player)
+            profiler.lap('flow_field')
+
+        if self.enemy_store:
+            self.enemy_store.move(resting)
+            self.enemy_store.update(self.player, resting)
+        else:
+            self.visible_sprites.enemy_update(self.player, resting)
+        profiler.lap('enemy_ai')
+
         self.player_attack_logic()
-        self.user_interface.display(self.player)
+        profiler.lap('attacks')
+
+    def draw(self, alpha: float = 1.0) -> None:
+        """Draws the level and the user interface
+
+        Args:
+            alpha (float, optional): The progress between the two last simulation ticks, used to
+                interpolate the moving sprites when `config.render_interpolation` is enabled.
+                Defaults to 1.0, the state of the last tick.
+        """
+        self.visible_sprites.custom_draw(self.player, alpha)
+        profiler.lap('draw')
+
+        if self.user_interface:
+            self.user_interface.display(self.player)
+            profiler.lap('ui')
+
+    def run(self) -> None:
+        """Runs one simulation tick and draws the result"""
+        self.update()
+        self.draw()
+
+
+NO_OFFSET = (0, 0)
 
 
 class YSortCameraGroup(pygame.sprite.Group):
     """A specialized sprite group for managing depth sorting in the game."""
 
-    def __init__(self) -> None:
+    def __init__(self, headless: bool = False) -> None:
         """Initializes the YSortCameraGroup class
 
         Sets up the camera group and initializes floor-related variables.
+
+        Args:
+            headless (bool, optional): Whether there is no display to draw on, the floor is then
+                not loaded. Defaults to False.
         """
         super().__init__()
-        self.display_surface = pygame.display.get_surface()
-        self.half_width = self.display_surface.get_size()[0] // 2
-        self.half_height = self.display_surface.get_size()[1] // 2
+        self.display_surface = None if headless else pygame.display.get_surface()
+        width, height = (config.width, config.height) if headless else \
+            self.display_surface.get_size()
+        self.half_width = width // 2
+        self.half_height = height // 2
         self.offset = pygame.math.Vector2()
 
-        # Creating the floor
-        self.floor_surf = pygame.image.load('lib/images/tilemap/ground.png').convert()
-        self.floor_rect = self.floor_surf.get_rect(topleft=(0, 0))
-
-    def custom_draw(self, player) -> None:
+        # Spatial indexes of the sprites, only the ones overlapping the camera are drawn. The static
+        # sprites are kept presorted by depth, only the moving ones are sorted each frame.
+        self.static_index = DepthSortedGrid(config.camera_cell_size)
+        self.moving_index = SpatialGrid(config.camera_cell_size)
+        self._order = {}
+        self._order_counter = count()
+        self._pending = {}
+        self._moving = {}
+
+        # Centers of the moving sprites before the last simulation tick, for the interpolation
+        self._previous = {}
+
+        # The static tiles and the particles drawn with the sprites when they are not sprites, set
+        # by the level
+        self.tiles = None
+        self.particles = None
+
+        # Creating the floor, its chunks are loaded when they come into view
+        self.floor = None if headless else Floor()
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None) -> None:
+        """Adds the sprite to the group, it is indexed on the next draw once its rect is set"""
+        super().add_internal(sprite, layer)
+        self._order[sprite] = next(self._order_counter)
+        self._pending[sprite] = None
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        """Removes the sprite from the group and from the spatial index"""
+        super().remove_internal(sprite)
+        self._order.pop(sprite, None)
+        self._pending.pop(sprite, None)
+        self._moving.pop(sprite, None)
+        self._previous.pop(sprite, None)
+        self.static_index.remove(sprite)
+        self.moving_index.remove(sprite)
+
+    def _refresh_index(self) -> None:
+        """Indexes the newly added sprites and moves the entities to their current cells"""
+        for sprite in self._pending:
+            if isinstance(sprite, Entity):
+                self._moving[sprite] = None
+                self.moving_index.insert(sprite)
+            else:
+                self.static_index.insert(sprite, self._order[sprite])
+        self._pending.clear()
+
+        for sprite in self._moving:
+            self.moving_index.move(sprite)
+
+    def snapshot(self) -> None:
+        """Records the centers of the moving sprites before a simulation tick"""
+        self._previous = {sprite: sprite.rect.center for sprite in self._moving}
+
+    def _lag(self, sprite: pygame.sprite.Sprite, alpha: float) -> Tuple[int, int]:
+        """Returns how far behind its current position a moving sprite is drawn"""
+        previous = self._previous.get(sprite)
+        if previous is None:
+            return NO_OFFSET
+        return (
+            round((sprite.rect.centerx - previous[0]) * (1 - alpha)),
+            round((sprite.rect.centery - previous[1]) * (1 - alpha))
+        )
+
+    def custom_draw(self, player, alpha: float = 1.0) -> None:
         """Draws game elements with depth sorting
 
         Draws elements based on their vertical position to create a depth effect. It draws the
         floor, aligns the camera to the player's position, and draws other elements with respect
         to their vertical positions.
+
+        Only the sprites overlapping the camera rectangle (plus a margin) are fetched from the
+        spatial indexes. The static ones come out presorted, only the moving ones, the tiles of
+        the tile layer and the batched particles in view are sorted before being merged with them.
+        The sprites are then submitted in a single batched blit, the frames packed in the atlas
+        being shifted by their trim offset.
+
+        When alpha is below 1, the moving sprites and the camera are drawn between their positions
+        before and after the last simulation tick.
+
+        Args:
+            player (Player): The player, followed by the camera.
+            alpha (float, optional): The progress between the two last simulation ticks. Defaults to
+                1.0, no interpolation.
         """
-        # Getting the offset
-        self.offset.x = player.rect.centerx - self.half_width
-        self.offset.y = player.rect.centery - self.half_height
+        interpolate = alpha < 1 and self._previous
 
-        # Drawing the floor
-        floor_offset_pos = self.floor_rect.topleft - self.offset
-        self.display_surface.blit(self.floor_surf, floor_offset_pos)
+        # Getting the offset
+        lag_x, lag_y = self._lag(player, alpha) if interpolate else NO_OFFSET
+        self.offset.x = player.rect.centerx - lag_x - self.half_width
+        self.offset.y = player.rect.centery - lag_y - self.half_height
+
+        # Drawing the visible part of the floor
+        self.floor.draw(self.display_surface, self.offset)
+
+        # Fetching the elements in view
+        self._refresh_index()
+        camera_rect = pygame.Rect(
+            self.offset.x,
+            self.offset.y,
+            self.half_width * 2,
+            self.half_height * 2
+        ).inflate(config.camera_margin * 2, config.camera_margin * 2)
+        static_sprites = (
+            (depth, order, sprite.image, sprite.rect.x, sprite.rect.y)
+            for depth, order, sprite in self.static_index.query_sorted(camera_rect)
+        )
+        tiles = self.tiles.query_sorted(camera_rect) if self.tiles is not None else ()
+        particles = self.particles.query_sorted(camera_rect) if self.particles is not None else ()
+        moving_sprites = []
+        for depth, order, sprite in sorted(
+                (sprite.rect.centery, self._order[sprite], sprite)
+                for sprite in self.moving_index.query(camera_rect)
+            ):
+            x_pos, y_pos = sprite.rect.topleft
+            if interpolate:
+                # Moving the sprite back towards its position before the last tick
+                lag_x, lag_y = self._lag(sprite, alpha)
+                x_pos -= lag_x
+                y_pos -= lag_y
+            moving_sprites.append((depth, order, sprite.image, x_pos, y_pos))
 
         # Drawing all the other elements
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-            offset_pos = sprite.rect.topleft - self.offset
-            self.display_surface.blit(sprite.image, offset_pos)
+        offset_x = int(self.offset.x)
+        offset_y = int(self.offset.y)
+        trim_offsets = atlas.offsets
+        blits = []
+        entries = merge_by_depth(static_sprites, tiles, particles, moving_sprites)
+        for image, x_pos, y_pos in entries:
+            trim_x, trim_y = trim_offsets.get(image, NO_OFFSET)
+            blits.append((image, (x_pos - offset_x + trim_x, y_pos - offset_y + trim_y)))
+        blit_batch(self.display_surface, blits)
     
-    def enemy_update(self, player):
+    def update(self, *args, resting=frozenset(), **kwargs) -> None:
+        """Updates the sprites of the group, except the resting ones
+
+        Args:
+            *args: The arguments passed to the update of the sprites.
+            resting (Set[pygame.sprite.Sprite], optional): The sprites not to update this frame.
+                Defaults to none.
+            **kwargs: The keyword arguments passed to the update of the sprites.
+        """
+        for sprite in self.sprites():
+            if sprite not in resting:
+                sprite.update(*args, **kwargs)
+
+    def enemy_update(self, player, resting=frozenset()):
         enemy_sprites = [
             sprite for sprite in self.sprites() \
-                if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy'
+                if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy' \
+                    and sprite not in resting
         ]
 
         for enemy in enemy_sprites:
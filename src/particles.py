@@ -1,76 +1,143 @@
 """slip de bain"""
 from __future__ import absolute_import
 
-from random import choice
-from typing import List
+import random
+from collections import deque
+from itertools import count
+from typing import Deque, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
 
 import pygame
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only required by the particle system
+    np = None
+
 from src.config import config
-from src.utils.utils import import_image_from_folder
+from src.pool import PooledSprite, SpritePool
+from src.utils.atlas import atlas, frame_rect
+from src.utils.utils import import_frames_from_folder
+
+
+# The folders of the frames of each animation
+ANIMATION_PATHS = {
+    # Magic
+    'flame': 'lib/images/particles/flame/frames',
+    'aura': 'lib/images/particles/aura/',
+    'heal': 'lib/images/particles/heal/frames',
+
+    # Attacks
+    'claw': 'lib/images/particles/claw/',
+    'splash': 'lib/images/particles/splash/',
+    'sparkle': 'lib/images/particles/sparkle/',
+    'leaf_attack': 'lib/images/particles/leaf_attack/',
+    'thunder': 'lib/images/particles/thunder/',
+
+    # Monster deaths
+    'squid': 'lib/images/particles/smoke_orange/',
+    'raccoon': 'lib/images/particles/raccoon/',
+    'spirit': 'lib/images/particles/nova/',
+    'bamboo': 'lib/images/particles/bamboo/'
+}
+
+# The leaf variants, each also played mirrored, the mirrored animations being named with a suffix
+LEAF_PATHS = tuple(f'lib/images/particles/leaf{index}' for index in range(1, 7))
+MIRRORED_SUFFIX = '_mirrored'
+ANIMATION_PATHS.update((f'leaf{index}', path) for index, path in enumerate(LEAF_PATHS, 1))
+LEAF_NAMES = tuple(f'leaf{index}' for index in range(1, 7))
+LEAF_NAMES += tuple(name + MIRRORED_SUFFIX for name in LEAF_NAMES)
 
 
 class AnimationPlayer:
-    def __init__(self) -> None:
-        self.frames = {
-            # Magic
-            'flame': import_image_from_folder('lib/images/particles/flame/frames'),
-            'aura': import_image_from_folder('lib/images/particles/aura/'),
-            'heal': import_image_from_folder('lib/images/particles/heal/frames'),
-
-            # Attacks
-            'claw': import_image_from_folder('lib/images/particles/claw/'),
-            'splash': import_image_from_folder('lib/images/particles/splash/'),
-            'sparkle': import_image_from_folder('lib/images/particles/sparkle/'),
-            'leaf_attack': import_image_from_folder('lib/images/particles/leaf_attack/'),
-            'thunder': import_image_from_folder('lib/images/particles/thunder/'),
-
-            # Monster deaths
-            'squid': import_image_from_folder('lib/images/particles/smoke_orange/'),
-            'raccoon': import_image_from_folder('lib/images/particles/raccoon/'),
-            'spirit': import_image_from_folder('lib/images/particles/nova/'),
-            'bamboo': import_image_from_folder('lib/images/particles/bamboo/'),
-
-            # Leaf
-            'leaf': (
-                import_image_from_folder('lib/image/particles/leaf1'),
-                import_image_from_folder('lib/image/particles/leaf2'),
-                import_image_from_folder('lib/image/particles/leaf3'),
-                import_image_from_folder('lib/image/particles/leaf4'),
-                import_image_from_folder('lib/image/particles/leaf5'),
-                import_image_from_folder('lib/image/particles/leaf6'),
-                self.reflect_images(import_image_from_folder('lib/image/particles/leaf1')),
-                self.reflect_images(import_image_from_folder('lib/image/particles/leaf2')),
-                self.reflect_images(import_image_from_folder('lib/image/particles/leaf3')),
-                self.reflect_images(import_image_from_folder('lib/image/particles/leaf4')),
-                self.reflect_images(import_image_from_folder('lib/image/particles/leaf5')),
-                self.reflect_images(import_image_from_folder('lib/image/particles/leaf6')),
-            )
-        }
+    def __init__(
+            self,
+            rng: Optional[random.Random] = None,
+            particles: Optional['ParticleSystem'] = None
+        ) -> None:
+        self.rng = rng or random.Random()
+        self.particles = particles
+        self.effect_pool = SpritePool(ParticleEffect, config.particle_pool_size)
 
-    def reflect_images(self, frames: List[pygame.Surface]) -> List[pygame.Surface]:
-        new_frames = []
-        for frame in frames:
-            flipped_frame = pygame.transform.flip(frame, True, False)
-            new_frames.append(flipped_frame)
+        # The animations are loaded on first use, or ahead of it by the prefetch
+        self.frames: Dict[str, Sequence] = {}
+        self._prefetch: Deque[str] = deque()
+
+    def _load(self, name: str) -> Sequence:
+        if name == 'leaf':
+            return tuple(self.animation(leaf_name) for leaf_name in LEAF_NAMES)
+        if name.endswith(MIRRORED_SUFFIX):
+            return self.reflect_images(self.animation(name[:-len(MIRRORED_SUFFIX)]))
+        return import_frames_from_folder(ANIMATION_PATHS[name])
+
+    def animation(self, name: str) -> Sequence:
+        """Returns the frames of an animation, loading them on first use
+
+        Args:
+            name (str): The name of the animation, 'leaf' giving the frames of every leaf variant
+                (see LEAF_NAMES).
+
+        Returns:
+            Sequence: The frames, or the tuple of the frames of each variant for 'leaf'.
+        """
+        if name not in self.frames:
+            self.frames[name] = self._load(name)
+        return self.frames[name]
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Queues animations likely needed soon, loaded by `update` within the frame budget
 
-        return new_frames
+        'leaf' queues each leaf variant and its mirror on their own, so that they are spread over
+        several ticks.
+
+        Args:
+            names (Iterable[str]): The names of the animations.
+        """
+        for name in names:
+            for unit in LEAF_NAMES if name == 'leaf' else (name,):
+                if unit not in self.frames and unit not in self._prefetch:
+                    self._prefetch.append(unit)
+
+    def update(self) -> None:
+        """Loads queued animations until config.animation_prefetch_frames frames were loaded"""
+        loaded = 0
+        while self._prefetch and loaded < config.animation_prefetch_frames:
+            name = self._prefetch.popleft()
+            if name not in self.frames:
+                loaded += len(self.animation(name))
+
+    def reflect_images(self, frames: List[pygame.Surface]) -> List[pygame.Surface]:
+        return atlas.flip(frames)
 
     def create_grass_particles(self, position, groups):
-        animation_frames = choice(self.frames['leaf'])
-        ParticleEffect(position, animation_frames, groups)
+        name = self.rng.choice(LEAF_NAMES)
+        animation_frames = self.animation(name)
+        if self.particles is not None:
+            self.particles.emit(position, animation_frames, name)
+        else:
+            self.effect_pool.acquire(position, animation_frames, groups)
 
 
-class ParticleEffect(pygame.sprite.Sprite):
+class ParticleEffect(PooledSprite):
     def __init__(self, position, animation_frames, groups) -> None:
-        super().__init__(groups)
+        super().__init__()
 
         self.animation_speed = config.animation_speed
+        self.reset(position, animation_frames, groups)
+
+    def reset(self, position, animation_frames, groups) -> None:
+        """Starts the effect again, at its first frame
+
+        Args:
+            position (Tuple[int, int]): The center of the effect.
+            animation_frames (Sequence[pygame.Surface]): The frames of the animation, played once.
+            groups (List[pygame.sprite.Group]): The groups the effect joins.
+        """
         self.frame_index = config.frame_index
         self.frames = animation_frames
 
         self.image = self.frames[self.frame_index]
-        self.rect = self.image.get_rect(center=position)
+        self.rect = frame_rect(self.image, center=position)
+        self.add(groups)
 
     def _animate(self):
         self.frame_index += self.animation_speed
@@ -81,3 +148,158 @@ class ParticleEffect(pygame.sprite.Sprite):
 
     def update(self):
         self._animate()
+
+
+class ParticleSystem:
+    """Batched particle effects, replacing a `ParticleEffect` sprite per effect
+
+    The particles are kept in fixed size arrays, grown as needed, holding their center, frame index
+    and animation. They are all advanced in one vectorized step per tick, a particle dying once
+    its frame index goes past its last frame, as a `ParticleEffect` does. The particles in view are
+    drawn by the camera in the same batched blit as the sprites.
+
+    NumPy is an optional dependency, only needed when `config.batched_particles` is enabled.
+
+    Attributes:
+        center (np.ndarray): The centers (x, y) of the particles.
+        frame_index (np.ndarray): The frame index of the particles, as a float.
+        frame_count (np.ndarray): The number of frames of the animation of the particles.
+        animation (np.ndarray): The index of the animation of the particles.
+        order (np.ndarray): The emission rank of the particles, breaking the depth ties.
+        alive (np.ndarray): Whether each slot is used.
+    """
+
+    def __init__(self, capacity: int = config.particle_capacity) -> None:
+        """Initializes the ParticleSystem class
+
+        Args:
+            capacity (int, optional): The initial number of slots, the arrays grow as needed.
+                Defaults to config.particle_capacity.
+
+        Raises:
+            ImportError: If numpy is not installed.
+        """
+        if np is None:
+            raise ImportError('The particle system requires numpy')
+
+        self.animation_speed = config.animation_speed
+        # The animations are registered on first use under the stable key given by the emitters
+        self._animation_indexes: Dict[Hashable, int] = {}
+        # The surface and top left corner offset of each frame of each animation, and the largest
+        # offset, how far from its center a particle may be drawn
+        self._frames: List[List[Tuple[pygame.Surface, int, int]]] = []
+        self._reach = 0
+        self._free: List[int] = []
+        self._order = count()
+        self._size = 0
+
+        self.center = np.zeros((capacity, 2), dtype=np.int64)
+        self.frame_index = np.zeros(capacity, dtype=np.float64)
+        self.frame_count = np.zeros(capacity, dtype=np.int64)
+        self.animation = np.zeros(capacity, dtype=np.int64)
+        self.order = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return int(self.alive[:self._size].sum())
+
+    def _grow(self) -> None:
+        """Doubles the capacity of the arrays"""
+        for name in ('center', 'frame_index', 'frame_count', 'animation', 'order', 'alive'):
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _animation_index(self, frames: Sequence[pygame.Surface], key: Hashable) -> int:
+        """Returns the index of the animation of a key, registering its frames on first use"""
+        index = self._animation_indexes.get(key)
+        if index is None:
+            index = len(self._frames)
+            self._animation_indexes[key] = index
+            self._frames.append([])
+            for frame in frames:
+                rect = frame_rect(frame)
+                self._frames[index].append((frame, rect.width // 2, rect.height // 2))
+                self._reach = max(self._reach, rect.width // 2 + 1, rect.height // 2 + 1)
+
+        return index
+
+    def emit(
+            self,
+            position: Tuple[int, int],
+            frames: Sequence[pygame.Surface],
+            key: Hashable
+        ) -> None:
+        """Starts a particle effect
+
+        Args:
+            position (Tuple[int, int]): The center of the effect.
+            frames (Sequence[pygame.Surface]): The frames of the animation, played once.
+            key (Hashable): The key of the animation, e.g. its name. The frames are registered
+                under it on its first emission, the later emissions of the key playing them.
+        """
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self.alive):
+                self._grow()
+            slot = self._size
+            self._size += 1
+
+        self.center[slot] = position
+        self.frame_index[slot] = config.frame_index
+        self.animation[slot] = index = self._animation_index(frames, key)
+        self.frame_count[slot] = len(self._frames[index])
+        self.order[slot] = next(self._order)
+        self.alive[slot] = True
+
+    def update(self) -> None:
+        """Advances the animation of every particle, the finished ones are freed"""
+        size = self._size
+        alive = self.alive[:size]
+        self.frame_index[:size][alive] += self.animation_speed
+
+        finished = alive & (self.frame_index[:size] >= self.frame_count[:size])
+        if finished.any():
+            alive[finished] = False
+            self._free.extend(np.flatnonzero(finished).tolist())
+
+    def clear(self) -> None:
+        """Removes every particle"""
+        self.alive[:] = False
+        self._free.clear()
+        self._size = 0
+
+    def query_sorted(self, rect: pygame.Rect) -> List[Tuple[int, int, pygame.Surface, int, int]]:
+        """Returns the particles drawn in a rectangle, sorted by depth
+
+        Args:
+            rect (pygame.Rect): The area to query, usually the camera with a margin.
+
+        Returns:
+            List[Tuple[int, int, pygame.Surface, int, int]]: The depth, the order, the surface and
+                the position of the current frame of each particle.
+        """
+        size = self._size
+        center = self.center[:size]
+        rect = rect.inflate(self._reach * 2, self._reach * 2)
+        slots = np.flatnonzero(
+            self.alive[:size]
+            & (center[:, 0] >= rect.left) & (center[:, 0] < rect.right)
+            & (center[:, 1] >= rect.top) & (center[:, 1] < rect.bottom)
+        )
+        slots = slots[np.lexsort((self.order[slots], center[slots, 1]))]
+
+        entries = []
+        frames = self._frames
+        for (x_pos, y_pos), animation, frame_index, order in zip(
+                center[slots].tolist(),
+                self.animation[slots].tolist(),
+                self.frame_index[slots].astype(np.int64).tolist(),
+                self.order[slots].tolist()
+            ):
+            image, half_width, half_height = frames[animation][frame_index]
+            entries.append((y_pos, order, image, x_pos - half_width, y_pos - half_height))
+
+        return entries
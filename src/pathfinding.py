@@ -0,0 +1,164 @@
+"""Flow field pathfinding on the collision grid, shared by all the enemies"""
+from __future__ import absolute_import
+
+from array import array
+from collections import deque
+from typing import Optional, Tuple
+
+import pygame
+
+from .collision import CollisionGrid
+from .config import config
+
+
+# Straight moves first, so that they are preferred over the diagonal ones at equal distance
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class FlowField:
+    """A breadth-first search from the player tile over the walkable tiles of the collision grid
+
+    Every tile reached by the search points to the next tile on a shortest path to the player, so
+    that any number of enemies find their way around the obstacles with a single lookup each. The
+    search is only run again when the player changes tile or the obstacles change, and it is limited
+    to a square of `radius` around the player, the enemies further away not noticing the player.
+
+    Diagonal moves are only allowed when both tiles they cut through are walkable, so that the
+    enemies do not get stuck on the corners of the obstacles.
+
+    The field is stored in flat arrays indexed as the collision grid occupancy, a tile being part of
+    the current field only if its stamp is the current generation. This avoids clearing the arrays
+    on each search.
+
+    Attributes:
+        obstacles (CollisionGrid): The collision grid the field is computed on.
+        radius (int): The maximum distance in tiles from the player of the tiles reached.
+        parents (array): The next tile towards the player of each tile of the field.
+        stamps (array): The generation of the search that last reached each tile.
+        generation (int): The generation of the current search.
+        origin (int): The tile of the player, -1 when the player is out of the grid.
+    """
+
+    def __init__(self, obstacles: CollisionGrid, radius: Optional[int] = None) -> None:
+        """Initializes the FlowField class
+
+        Args:
+            obstacles (CollisionGrid): The collision grid the field is computed on.
+            radius (int, optional): The maximum distance in pixels from the player at which the
+                enemies follow the field. Defaults to the largest notice radius of the monsters.
+        """
+        if radius is None:
+            radius = max(info['notice_radius'] for info in config.monster_data.values())
+
+        self.obstacles = obstacles
+        self.radius = -(-radius // obstacles.tilesize) + 1
+
+        size = obstacles.cols * obstacles.rows
+        self.parents = array('i', bytes(4 * size))
+        self.stamps = array('I', bytes(4 * size))
+        self.generation = 0
+        self.origin = -1
+        self._version = None
+
+    def cell_of(self, pos: Tuple[int, int]) -> int:
+        """Returns the index of the tile containing a position, -1 when out of the grid
+
+        Args:
+            pos (Tuple[int, int]): The position in pixels.
+
+        Returns:
+            int: The index of the tile, as in the collision grid occupancy.
+        """
+        col = int(pos[0] // self.obstacles.tilesize)
+        row = int(pos[1] // self.obstacles.tilesize)
+        if not (0 <= col < self.obstacles.cols and 0 <= row < self.obstacles.rows):
+            return -1
+        return row * self.obstacles.cols + col
+
+    def update(self, player: pygame.sprite.Sprite) -> bool:
+        """Runs the search again if the player changed tile or the obstacles changed
+
+        Args:
+            player (pygame.sprite.Sprite): The player.
+
+        Returns:
+            bool: Whether the field was computed again.
+        """
+        origin = self.cell_of(player.hitbox.center)
+        if origin == self.origin and self._version == self.obstacles.version:
+            return False
+
+        self.origin = origin
+        self._version = self.obstacles.version
+        self._search()
+
+        return True
+
+    def _search(self) -> None:
+        """Breadth-first search from the player tile, within the radius"""
+        self.generation += 1
+        if self.origin < 0:
+            return
+
+        cols = self.obstacles.cols
+        occupancy = self.obstacles.occupancy
+        parents = self.parents
+        stamps = self.stamps
+        generation = self.generation
+
+        origin_col, origin_row = self.origin % cols, self.origin // cols
+        col_min = max(origin_col - self.radius, 0)
+        col_max = min(origin_col + self.radius, cols - 1)
+        row_min = max(origin_row - self.radius, 0)
+        row_max = min(origin_row + self.radius, self.obstacles.rows - 1)
+
+        stamps[self.origin] = generation
+        parents[self.origin] = self.origin
+        queue = deque((self.origin,))
+        while queue:
+            cell = queue.popleft()
+            col, row = cell % cols, cell // cols
+            for d_col, d_row in NEIGHBOURS:
+                n_col, n_row = col + d_col, row + d_row
+                if not (col_min <= n_col <= col_max and row_min <= n_row <= row_max):
+                    continue
+
+                neighbour = n_row * cols + n_col
+                if stamps[neighbour] == generation or occupancy[neighbour]:
+                    continue
+                if d_col and d_row and (
+                        occupancy[row * cols + n_col] or occupancy[cell + d_row * cols]
+                    ):
+                    continue
+
+                stamps[neighbour] = generation
+                parents[neighbour] = cell
+                queue.append(neighbour)
+
+    def direction(self, pos: Tuple[int, int], target: Tuple[int, int]) -> pygame.math.Vector2:
+        """Returns the direction to follow from a position to reach the player
+
+        The direction points to the center of the next tile of the field. From the player tile, or
+        from a tile the field does not reach, it points straight to the target.
+
+        Args:
+            pos (Tuple[int, int]): The position to move from, usually the center of a hitbox.
+            target (Tuple[int, int]): The position of the player.
+
+        Returns:
+            pygame.math.Vector2: The normalized direction, null when already on the target.
+        """
+        cell = self.cell_of(pos)
+        if cell < 0 or cell == self.origin or self.stamps[cell] != self.generation:
+            offset = pygame.math.Vector2(target) - pygame.math.Vector2(pos)
+        else:
+            parent = self.parents[cell]
+            tilesize = self.obstacles.tilesize
+            offset = pygame.math.Vector2(
+                (parent % self.obstacles.cols + 0.5) * tilesize - pos[0],
+                (parent // self.obstacles.cols + 0.5) * tilesize - pos[1]
+            )
+
+        if offset.length_squared() == 0:
+            return pygame.math.Vector2()
+        return offset.normalize()
@@ -1,13 +1,17 @@
 """docstring goes here"""
 from __future__ import absolute_import
 
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import pygame
 
-from src.entity import Entity
+from src.clock import GameClock
+from src.entity import INVISIBLE, Entity
 from src.config import config
-from src.utils.utils import import_image_from_folder
+from src.input import InputSource, KeyboardInput
+from src.utils.assets import assets
+from src.utils.atlas import frame_rect
+from src.utils.utils import import_frames_from_folder
 
 
 class Player(Entity):
@@ -20,7 +24,9 @@ class Player(Entity):
             obstacles: pygame.sprite.Group,
             create_attack: Callable,
             destroy_attack: Callable,
-            create_magic: Callable
+            create_magic: Callable,
+            input_source: Optional[InputSource] = None,
+            clock: Optional[GameClock] = None
         ) -> None:
         """Initializes the Player class.
 
@@ -30,11 +36,14 @@ class Player(Entity):
             obstacles (pygame.sprite.Group): Sprite group representing obstacles.
             create_attack (Callable): Function to create an attack.
             destroy_attack (Callable): Function to destroy an attack.
+            input_source (InputSource, optional): The source of the keys state, polled once per
+                tick by the level. Defaults to the keyboard.
+            clock (GameClock, optional): The clock of the cooldowns. Defaults to the real time.
         """
-        super().__init__(groups)
+        super().__init__(groups, clock)
 
         # Image init
-        self.image = pygame.image.load('lib/images/dummy/player.png').convert_alpha()
+        self.image = assets.image('lib/images/dummy/player.png')
         self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(0, -26)
 
@@ -70,6 +79,9 @@ class Player(Entity):
         self.exp = 123
         self.speed = self.stats['speed']
 
+        # Keys state, polled by the level
+        self.input_source = input_source or KeyboardInput()
+
         # Obstacles of the player for which we have to handle collision
         self.obstacles_sprite = obstacles
 
@@ -100,14 +112,15 @@ class Player(Entity):
         }
 
         for animation in self.animations:
-            self.animations[animation] = import_image_from_folder(path + animation)
+            self.animations[animation] = import_frames_from_folder(path + animation)
 
     def _input(self) -> None:
         """Handle user input to control player actions
 
         Detects and processes key presses by the user to manipulate the player's avatar behavior.
 
-        Reads the keyboard input to determine movement and attack actions:
+        Reads the keys state of the input source (the keyboard by default) to determine movement
+        and attack actions:
         - 'Z' or 'S' keys control vertical movement (up/down).
         - 'D' or 'Q' keys control horizontal movement (right/left).
         - 'SPACE' triggers an attack action, initiating the attack sequence.
@@ -119,7 +132,7 @@ class Player(Entity):
         attacks according to the assigned keys.
         """
         if not self.attacking:
-            keys = pygame.key.get_pressed()
+            keys = self.input_source.keys
 
             # Movements input
             if keys[pygame.K_z]:
@@ -143,12 +156,12 @@ class Player(Entity):
             # Attack input
             if keys[pygame.K_SPACE]:
                 self.attacking = True
-                self.attack_time = pygame.time.get_ticks()
+                self.attack_time = self.clock.get_ticks()
                 self.create_attack()
 
             if keys[pygame.K_a] and self.can_switch_weapon:
                 self.can_switch_weapon = False
-                self.weapon_switch_time = pygame.time.get_ticks()
+                self.weapon_switch_time = self.clock.get_ticks()
                 if self.weapon_index < len(config.weapon_data) - 1:
                     self.weapon_index += 1
                 else:
@@ -157,7 +170,7 @@ class Player(Entity):
 
             if keys[pygame.K_LCTRL]:
                 self.attacking = True
-                self.attack_time = pygame.time.get_ticks()
+                self.attack_time = self.clock.get_ticks()
                 style = list(config.magic_data.keys())[self.magic_index]
                 strenght = list(config.magic_data.values())[self.magic_index]['strenght'] + \
                         self.stats['magic']
@@ -166,7 +179,7 @@ class Player(Entity):
 
             if keys[pygame.K_e] and self.can_switch_magic:
                 self.can_switch_magic = False
-                self.magic_switch_time = pygame.time.get_ticks()
+                self.magic_switch_time = self.clock.get_ticks()
                 if self.magic_index < len(config.magic_data) - 1:
                     self.magic_index += 1
                 else:
@@ -207,7 +220,7 @@ class Player(Entity):
         unable to switch weapons (due to a recent switch), it checks whether enough time has elapsed
         to enable weapon switching again.
         """
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if self.attacking:
             if current_time - self.attack_time >= \
                     self.attack_cooldown + config.weapon_data[self.weapon]['cooldown']:
@@ -241,15 +254,11 @@ class Player(Entity):
         if self.frame_index >= len(animation):
             self.frame_index = 0
 
-        self.image = animation[int(self.frame_index)]
-        self.rect = self.image.get_rect(center=self.hitbox.center)
+        frame = animation[int(self.frame_index)]
+        self.rect = frame_rect(frame, center=self.hitbox.center)
 
-        # Flicker if hit
-        if not self.vulnerable:
-            alpha = self._wave_value()
-            self.image.set_alpha(alpha)
-        else:
-            self.image.set_alpha(255)
+        # Flicker if hit, by drawing nothing instead of the shared frame
+        self.image = frame if self.vulnerable or self._wave_value() else INVISIBLE
 
     def get_full_weapon_damage(self):
         base_damage = self.stats['attack']
@@ -0,0 +1,111 @@
+"""Pools recycling the short lived sprites (weapons, particle effects)"""
+from __future__ import absolute_import
+
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+import pygame
+
+
+class PooledSprite(pygame.sprite.Sprite, ABC):
+    """A sprite that can be recycled by a `SpritePool`
+
+    The state of the sprite is set by `reset`, called with the arguments of the constructor both
+    when the sprite is built and when it is taken back from its pool. Killing a pooled sprite
+    returns it to its pool.
+
+    Attributes:
+        pool (Optional[SpritePool]): The pool the sprite returns to when killed, None when it is not
+            pooled.
+    """
+
+    pool: Optional['SpritePool'] = None
+
+    @abstractmethod
+    def reset(self, *args, **kwargs) -> None:
+        """Arms the sprite again, as if it was just built
+
+        Args:
+            *args: The arguments of the constructor.
+            **kwargs: The keyword arguments of the constructor.
+        """
+
+    def kill(self) -> None:
+        """Removes the sprite from its groups and returns it to its pool"""
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
+
+
+class SpritePool:
+    """Keeps the killed sprites of a class to arm them again instead of building new ones
+
+    Attributes:
+        factory (Callable[..., PooledSprite]): Builds a sprite when the pool is empty.
+        capacity (int): The most sprites kept, the sprites killed beyond it are dropped.
+        hits (int): The number of sprites taken from the pool.
+        misses (int): The number of sprites built because the pool was empty.
+    """
+
+    def __init__(self, factory: Callable[..., PooledSprite], capacity: int) -> None:
+        """Initializes the SpritePool class
+
+        Args:
+            factory (Callable[..., PooledSprite]): Builds a sprite, usually its class.
+            capacity (int): The most sprites kept.
+        """
+        self.factory = factory
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+        self._free: Dict[PooledSprite, None] = {}
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self, *args, **kwargs) -> PooledSprite:
+        """Returns a sprite armed with the given arguments, recycled when possible
+
+        Args:
+            *args: The arguments of the constructor of the sprite.
+            **kwargs: The keyword arguments of the constructor of the sprite.
+
+        Returns:
+            PooledSprite: The armed sprite.
+        """
+        if self._free:
+            sprite, _ = self._free.popitem()
+            sprite.reset(*args, **kwargs)
+            self.hits += 1
+        else:
+            sprite = self.factory(*args, **kwargs)
+            sprite.pool = self
+            self.misses += 1
+
+        return sprite
+
+    def release(self, sprite: PooledSprite) -> None:
+        """Keeps a killed sprite for reuse, if the pool is not full
+
+        Releasing a sprite already in the pool does nothing, so that killing a sprite twice is safe.
+
+        Args:
+            sprite (PooledSprite): The killed sprite.
+        """
+        if len(self._free) < self.capacity:
+            self._free[sprite] = None
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the pool statistics
+
+        Returns:
+            Dict[str, float]: The number of free sprites, the hits, the misses and the hit rate.
+        """
+        requests = self.hits + self.misses
+        return {
+            'free': len(self._free),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
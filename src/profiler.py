@@ -0,0 +1,188 @@
+"""Per-phase frame profiler, with an on-screen overlay and trace export"""
+from __future__ import absolute_import
+
+import csv
+import json
+from collections import deque
+from math import ceil
+from time import perf_counter
+from typing import Callable, Deque, Dict, List, Tuple
+
+from .config import config
+
+
+class FrameProfiler:
+    """Records how long each phase of each frame takes
+
+    A frame is delimited by `begin_frame` and `end_frame`, and each phase ends with a `lap` naming
+    it, the time since the previous lap being added to the phase. A phase lapped several times in a
+    frame (e.g. the update of several simulation ticks) adds up.
+
+    Nothing is measured unless the overlay is shown or a trace is being recorded, `lap` returning
+    right away. Enabling either takes effect at the next frame.
+
+    Attributes:
+        window (int): The number of frames the rolling statistics are computed over.
+        overlay (bool): Whether the overlay is shown.
+        recording (bool): Whether the frames are recorded in the trace.
+        history (Dict[str, Deque[float]]): The durations in milliseconds of each phase over the
+            last frames, 'frame' being the whole frame.
+        trace (List[Dict[str, float]]): The recorded frames, as the duration of each phase.
+        counters (Dict[str, Callable[[], Dict[str, float]]]): The functions returning the
+            statistics shown in the overlay below the phases, by name.
+    """
+
+    def __init__(self, window: int = config.profiler_window) -> None:
+        """Initializes the FrameProfiler class
+
+        Args:
+            window (int, optional): The number of frames of the rolling statistics. Defaults to
+                config.profiler_window.
+        """
+        self.window = window
+        self.overlay = False
+        self.recording = False
+
+        self.history: Dict[str, Deque[float]] = {}
+        self.trace: List[Dict[str, float]] = []
+        self.counters: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+        self._active = False
+        self._frame: Dict[str, float] = {}
+        self._frame_index = 0
+        self._start = 0.0
+        self._last = 0.0
+
+    def begin_frame(self) -> None:
+        """Starts measuring a frame"""
+        self._active = self.overlay or self.recording
+        if self._active:
+            self._frame = {}
+            self._start = self._last = perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Ends a phase of the current frame
+
+        Args:
+            phase (str): The name of the phase.
+        """
+        if not self._active:
+            return
+
+        now = perf_counter()
+        self._frame[phase] = self._frame.get(phase, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self) -> None:
+        """Ends the current frame and records its timings"""
+        if not self._active:
+            return
+
+        self._frame['frame'] = (perf_counter() - self._start) * 1000
+        for phase, duration in self._frame.items():
+            if phase not in self.history:
+                self.history[phase] = deque(maxlen=self.window)
+            self.history[phase].append(duration)
+
+        if self.recording:
+            self.trace.append(dict(self._frame, index=self._frame_index))
+        self._frame_index += 1
+        self._active = False
+
+    def stats(self) -> Dict[str, Tuple[float, float]]:
+        """Returns the rolling statistics of each phase
+
+        Returns:
+            Dict[str, Tuple[float, float]]: The average and the 99th percentile of the durations in
+                milliseconds of each phase, over the last frames.
+        """
+        stats = {}
+        for phase, durations in self.history.items():
+            ordered = sorted(durations)
+            stats[phase] = (
+                sum(ordered) / len(ordered),
+                ordered[max(ceil(len(ordered) * 0.99) - 1, 0)]
+            )
+
+        return stats
+
+    def draw_overlay(self) -> None:
+        """Draws the rolling statistics of the phases on the screen, if the overlay is shown"""
+        if not self.overlay:
+            return
+
+        # Imported on demand, the debug module loads its font when imported
+        from .utils.debug import debug
+
+        debug(f'{"phase":<12}{"avg ms":>8}{"p99 ms":>8}')
+        stats = self.stats()
+        for line, (phase, (average, percentile)) in enumerate(stats.items(), 1):
+            debug(f'{phase:<12}{average:>8.2f}{percentile:>8.2f}', y_pos=10 + line * 24)
+
+        for line, (name, counter) in enumerate(self.counters.items(), len(stats) + 2):
+            values = ' '.join(f'{key} {value:.4g}' for key, value in counter().items())
+            debug(f'{name}: {values}', y_pos=10 + line * 24)
+
+    def watch(self, name: str, counter: Callable[[], Dict[str, float]]) -> None:
+        """Shows statistics in the overlay, e.g. the ones of a cache or a pool
+
+        Args:
+            name (str): The name of the statistics, a watched name being replaced.
+            counter (Callable[[], Dict[str, float]]): Function returning the statistics.
+        """
+        self.counters[name] = counter
+
+    def toggle_overlay(self) -> None:
+        """Shows or hides the overlay"""
+        self.overlay = not self.overlay
+
+    def toggle_recording(self, path: str = config.profiler_trace_path) -> None:
+        """Starts recording a trace, or stops and exports it
+
+        Args:
+            path (str, optional): The file the trace is exported to when the recording stops.
+                Defaults to config.profiler_trace_path.
+        """
+        if self.recording:
+            self.stop_recording()
+            self.export(path)
+        else:
+            self.start_recording()
+
+    def start_recording(self) -> None:
+        """Starts recording a new trace, from the next frame"""
+        self.trace = []
+        self.recording = True
+
+    def stop_recording(self) -> List[Dict[str, float]]:
+        """Stops recording the trace, without exporting it
+
+        Returns:
+            List[Dict[str, float]]: The recorded frames, as the duration of each phase.
+        """
+        self.recording = False
+        return self.trace
+
+    def export(self, path: str) -> None:
+        """Writes the recorded trace to a CSV or JSON file, according to its extension
+
+        Args:
+            path (str): The path of the trace file, ending with '.json' or '.csv'.
+        """
+        phases = [
+            phase for phase in dict.fromkeys(phase for frame in self.trace for phase in frame)
+            if phase != 'index'
+        ]
+
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as trace_file:
+                json.dump({'phases': phases, 'frames': self.trace}, trace_file)
+            return
+
+        with open(path, 'w', encoding='utf-8', newline='') as trace_file:
+            writer = csv.DictWriter(trace_file, ['index'] + phases, restval=0)
+            writer.writeheader()
+            writer.writerows(self.trace)
+
+
+profiler = FrameProfiler()
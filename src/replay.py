@@ -0,0 +1,206 @@
+"""Deterministic recording and replay of the games
+
+A recording logs the seed of the level and, for each simulation tick, the keys read by the player
+and the time of the game clock. Replaying it feeds the same keys and times back through the level
+built with the same seed, which reproduces the same world, tick for tick. The state digest of the
+level at the end of the recording is saved along, so that a replay can check it ended in the same
+state.
+"""
+from __future__ import absolute_import
+
+import json
+from typing import List, Sequence, Tuple
+
+from .clock import GameClock
+from .input import PLAYER_KEYS, NO_KEYS, InputSource, PressedKeys
+
+
+REPLAY_VERSION = 1
+
+
+class RecordingInput(InputSource):
+    """An input source logging the keys read by the player from another source
+
+    Attributes:
+        source (InputSource): The recorded source.
+        log (List[List[int]]): The codes of the keys pressed at each tick.
+    """
+
+    def __init__(self, source: InputSource) -> None:
+        """Initializes the RecordingInput class
+
+        Args:
+            source (InputSource): The source to record.
+        """
+        super().__init__()
+        self.source = source
+        self.log: List[List[int]] = []
+
+    @property
+    def finished(self) -> bool:
+        """Whether the recorded source is over"""
+        return self.source.finished
+
+    def poll(self) -> None:
+        """Polls the recorded source and logs the state of the player keys"""
+        self.source.poll()
+        pressed = [key for key in PLAYER_KEYS if self.source.keys[key]]
+        self.keys = PressedKeys(pressed)
+        self.log.append(pressed)
+
+
+class RecordingClock(GameClock):
+    """A clock reading the time of another clock once per tick and logging it
+
+    The time does not change during a tick, so that the whole tick can be replayed at the same
+    time.
+
+    Attributes:
+        clock (GameClock): The recorded clock.
+        start (int): The time before the first tick.
+        log (List[int]): The time of each tick.
+    """
+
+    def __init__(self, clock: GameClock) -> None:
+        """Initializes the RecordingClock class
+
+        Args:
+            clock (GameClock): The clock to record.
+        """
+        self.clock = clock
+        self.rate = clock.rate
+        self.start = clock.get_ticks()
+        self.log: List[int] = []
+        self._time = self.start
+
+    def get_ticks(self) -> int:
+        return self._time
+
+    def step(self) -> None:
+        """Steps the recorded clock and logs its time"""
+        self.clock.step()
+        self._time = self.clock.get_ticks()
+        self.log.append(self._time)
+
+
+class Recorder:
+    """Records a game, to be created before its level and saved once it is over
+
+    Attributes:
+        seed (int): The seed of the level.
+        input (RecordingInput): The input source to build the level with.
+        clock (RecordingClock): The clock to build the level with.
+    """
+
+    def __init__(self, seed: int, input_source: InputSource, clock: GameClock) -> None:
+        """Initializes the Recorder class
+
+        Args:
+            seed (int): The seed of the level.
+            input_source (InputSource): The input source of the game.
+            clock (GameClock): The clock of the game.
+        """
+        self.seed = seed
+        self.input = RecordingInput(input_source)
+        self.clock = RecordingClock(clock)
+
+    def save(self, path: str, state: str) -> None:
+        """Writes the recording to a JSON file
+
+        Args:
+            path (str): The path of the recording file.
+            state (str): The state digest of the level at the end of the recording.
+        """
+        with open(path, 'w', encoding='utf-8') as replay_file:
+            json.dump({
+                'version': REPLAY_VERSION,
+                'seed': self.seed,
+                'start': self.clock.start,
+                'ticks': [list(tick) for tick in zip(self.clock.log, self.input.log)],
+                'state': state
+            }, replay_file)
+
+
+class ReplayInput(InputSource):
+    """An input source playing the keys of a recording back, one tick per poll"""
+
+    def __init__(self, keys: Sequence[Sequence[int]]) -> None:
+        """Initializes the ReplayInput class
+
+        Args:
+            keys (Sequence[Sequence[int]]): The codes of the keys pressed at each tick.
+        """
+        super().__init__()
+        self._keys = [PressedKeys(pressed) for pressed in keys]
+        self.tick = 0
+
+    @property
+    def finished(self) -> bool:
+        """Whether every tick of the recording was polled"""
+        return self.tick >= len(self._keys)
+
+    def poll(self) -> None:
+        """Plays the keys of the next tick, none once the recording is over"""
+        self.keys = self._keys[self.tick] if self.tick < len(self._keys) else NO_KEYS
+        self.tick += 1
+
+
+class ReplayClock(GameClock):
+    """A clock playing the times of a recording back, one tick per step"""
+
+    def __init__(self, start: int, times: Sequence[int]) -> None:
+        """Initializes the ReplayClock class
+
+        Args:
+            start (int): The time before the first tick.
+            times (Sequence[int]): The time of each tick.
+        """
+        self._times = list(times)
+        self._time = start
+        self._tick = 0
+
+    def get_ticks(self) -> int:
+        return self._time
+
+    def step(self) -> None:
+        """Moves to the time of the next tick, the time stops once the recording is over"""
+        if self._tick < len(self._times):
+            self._time = self._times[self._tick]
+        self._tick += 1
+
+
+class Replay:
+    """A recording loaded to be replayed
+
+    Attributes:
+        seed (int): The seed to build the level with.
+        ticks (int): The number of ticks recorded.
+        input (ReplayInput): The input source to build the level with.
+        clock (ReplayClock): The clock to build the level with.
+        state (str): The state digest of the level at the end of the recording.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Loads a recording
+
+        Args:
+            path (str): The path of the recording file.
+
+        Raises:
+            ValueError: If the file is not a recording of a supported version.
+        """
+        with open(path, encoding='utf-8') as replay_file:
+            data = json.load(replay_file)
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError(f'Unsupported recording version: {data.get("version")}')
+
+        times, keys = self._split(data['ticks'])
+        self.seed = data['seed']
+        self.ticks = len(times)
+        self.input = ReplayInput(keys)
+        self.clock = ReplayClock(data['start'], times)
+        self.state = data['state']
+
+    @staticmethod
+    def _split(ticks: List[List]) -> Tuple[List[int], List[List[int]]]:
+        return [tick[0] for tick in ticks], [tick[1] for tick in ticks]
@@ -0,0 +1,121 @@
+"""Level-of-detail scheduling of the enemies AI"""
+from __future__ import absolute_import
+
+from itertools import count
+from typing import Dict, List, Set
+
+import pygame
+
+from .config import config
+
+
+FULL, REDUCED, ASLEEP = range(3)
+
+
+class ActivityScheduler:
+    """Decides which enemies are updated each frame, according to their distance to the player
+
+    The enemies are sorted in three tiers, every `config.ai_schedule_interval` frames:
+        - full rate: the enemies on screen, within their notice radius of the player (plus
+          `config.ai_wake_margin`), or busy (not idle, attacked or recovering from an attack),
+        - reduced rate: the other enemies within `config.ai_sleep_distance` of the player, updated
+          once every `config.ai_reduced_interval` frames, staggered so the load is spread,
+        - asleep: the idle enemies further away, not updated at all.
+
+    Outside of its notice radius an enemy stays idle and still, so skipping its updates does not
+    change its behaviour. The wake margin is larger than the distance the player covers between two
+    schedulings, so that every enemy runs at full rate before the player comes within its notice
+    radius. A hit enemy is woken up right away with `wake`, and the enemies created since the last
+    scheduling run at full rate until the next one.
+
+    Attributes:
+        enemies (pygame.sprite.Group): The enemies scheduled.
+        frame (int): The number of frames scheduled.
+        tiers (Dict[pygame.sprite.Sprite, int]): The tier of each enemy at the last scheduling.
+    """
+
+    def __init__(self, enemies: pygame.sprite.Group) -> None:
+        """Initializes the ActivityScheduler class
+
+        Args:
+            enemies (pygame.sprite.Group): The enemies scheduled.
+        """
+        self.enemies = enemies
+        self.frame = 0
+        self.tiers: Dict[pygame.sprite.Sprite, int] = {}
+
+        self._phases: Dict[pygame.sprite.Sprite, int] = {}
+        self._phase_counter = count()
+        self._resting: List[Set[pygame.sprite.Sprite]] = [
+            set() for _ in range(config.ai_reduced_interval)
+        ]
+
+    @staticmethod
+    def _is_busy(enemy: pygame.sprite.Sprite) -> bool:
+        """Whether the enemy has ongoing actions, moves or cooldowns"""
+        return enemy.status != 'idle' or not enemy.vulnerable or not enemy.can_attack
+
+    def _tier(self, enemy: pygame.sprite.Sprite, player: pygame.sprite.Sprite) -> int:
+        """Returns the tier of an enemy according to its distance to the player"""
+        if self._is_busy(enemy):
+            return FULL
+
+        offset_x = abs(enemy.rect.centerx - player.rect.centerx)
+        offset_y = abs(enemy.rect.centery - player.rect.centery)
+        on_screen = offset_x - enemy.rect.width // 2 <= config.width // 2 + config.ai_wake_margin \
+            and offset_y - enemy.rect.height // 2 <= config.height // 2 + config.ai_wake_margin
+
+        distance_squared = offset_x ** 2 + offset_y ** 2
+        if on_screen or distance_squared <= (enemy.notice_radius + config.ai_wake_margin) ** 2:
+            return FULL
+        if distance_squared <= config.ai_sleep_distance ** 2:
+            return REDUCED
+        return ASLEEP
+
+    def _schedule(self, player: pygame.sprite.Sprite) -> None:
+        """Sorts the enemies in tiers and precomputes the enemies resting on each frame"""
+        self.tiers = {enemy: self._tier(enemy, player) for enemy in self.enemies}
+
+        for enemy in self.tiers:
+            if enemy not in self._phases:
+                self._phases[enemy] = next(self._phase_counter) % config.ai_reduced_interval
+        for enemy in [enemy for enemy in self._phases if enemy not in self.tiers]:
+            del self._phases[enemy]
+
+        asleep = {enemy for enemy, tier in self.tiers.items() if tier == ASLEEP}
+        for phase, resting in enumerate(self._resting):
+            resting.clear()
+            resting.update(asleep)
+            resting.update(
+                enemy for enemy, tier in self.tiers.items()
+                if tier == REDUCED and self._phases[enemy] != phase
+            )
+
+    def wake(self, enemy: pygame.sprite.Sprite) -> None:
+        """Runs an enemy at full rate until the next scheduling, e.g. when it is hit
+
+        Args:
+            enemy (pygame.sprite.Sprite): The enemy to wake up.
+        """
+        if self.tiers.get(enemy, FULL) != FULL:
+            self.tiers[enemy] = FULL
+            for resting in self._resting:
+                resting.discard(enemy)
+
+    def update(self, player: pygame.sprite.Sprite) -> Set[pygame.sprite.Sprite]:
+        """Schedules the current frame
+
+        Args:
+            player (pygame.sprite.Sprite): The player.
+
+        Returns:
+            Set[pygame.sprite.Sprite]: The enemies that must not be updated this frame. The set must
+                not be modified.
+        """
+        if self.frame % config.ai_schedule_interval == 0:
+            self._schedule(player)
+
+        resting = self._resting[self.frame % config.ai_reduced_interval]
+        self.frame += 1
+
+        return resting
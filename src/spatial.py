@@ -0,0 +1,301 @@
+"""Uniform grid spatial index for the sprites of the level"""
+from __future__ import absolute_import
+
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Dict, Iterable, Iterator, List, Tuple, Type
+
+import pygame
+
+
+Span = Tuple[int, int, int, int]
+
+
+class SpatialGrid:
+    """A spatial hash bucketing sprites by the grid cells their rectangle overlaps
+
+    A sprite is registered in every cell covered by its rectangle. Moving a sprite only touches the
+    index when it crosses a cell border, so updating the sprites that moved is cheap.
+
+    Attributes:
+        cell_size (int): The size of a cell in pixels.
+        rect_attr (str): The name of the sprite attribute holding the indexed rectangle.
+    """
+
+    def __init__(self, cell_size: int, rect_attr: str = 'rect') -> None:
+        """Initializes the SpatialGrid class
+
+        Args:
+            cell_size (int): The size of a cell in pixels.
+            rect_attr (str, optional): The sprite attribute holding the indexed rectangle. Defaults
+                to 'rect'.
+        """
+        self.cell_size = cell_size
+        self.rect_attr = rect_attr
+
+        self._cells: Dict[Tuple[int, int], Dict[pygame.sprite.Sprite, None]] = {}
+        self._spans: Dict[pygame.sprite.Sprite, Span] = {}
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __contains__(self, sprite: pygame.sprite.Sprite) -> bool:
+        return sprite in self._spans
+
+    def _span(self, rect: pygame.Rect) -> Span:
+        """Returns the first and last columns and rows of the cells overlapped by a rectangle"""
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size,
+            (rect.bottom - 1) // size
+        )
+
+    @staticmethod
+    def _cells_of(span: Span) -> Iterator[Tuple[int, int]]:
+        col_start, row_start, col_end, row_end = span
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                yield col, row
+
+    def insert(self, sprite: pygame.sprite.Sprite) -> None:
+        """Registers a sprite in the cells covered by its rectangle
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to index.
+        """
+        span = self._span(getattr(sprite, self.rect_attr))
+        self._spans[sprite] = span
+        for cell in self._cells_of(span):
+            self._cells.setdefault(cell, {})[sprite] = None
+
+    def remove(self, sprite: pygame.sprite.Sprite) -> None:
+        """Unregisters a sprite from the index, if it is indexed
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to remove.
+        """
+        span = self._spans.pop(sprite, None)
+        if span is None:
+            return
+
+        for cell in self._cells_of(span):
+            bucket = self._cells[cell]
+            del bucket[sprite]
+            if not bucket:
+                del self._cells[cell]
+
+    def move(self, sprite: pygame.sprite.Sprite) -> None:
+        """Updates the cells of a sprite after its rectangle moved
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite that moved.
+        """
+        if self._spans.get(sprite) != self._span(getattr(sprite, self.rect_attr)):
+            self.remove(sprite)
+            self.insert(sprite)
+
+    def query(self, rect: pygame.Rect) -> List[pygame.sprite.Sprite]:
+        """Returns the indexed sprites whose rectangle overlaps the given rectangle
+
+        Args:
+            rect (pygame.Rect): The area to query.
+
+        Returns:
+            List[pygame.sprite.Sprite]: The overlapping sprites, without duplicates.
+        """
+        found = {}
+        for cell in self._cells_of(self._span(rect)):
+            bucket = self._cells.get(cell)
+            if bucket:
+                found.update(bucket)
+
+        rect_attr = self.rect_attr
+        return [sprite for sprite in found if rect.colliderect(getattr(sprite, rect_attr))]
+
+    def clear(self) -> None:
+        """Unregisters every sprite"""
+        self._cells.clear()
+        self._spans.clear()
+
+
+class SpatialGroup(pygame.sprite.Group):
+    """A sprite group indexed by a spatial grid, to collide a few sprites with many
+
+    The sprites are indexed on the first query following their addition, once their rectangle is
+    set. The moving sprites are moved to their current cells before each query, the other ones are
+    static and never leave their cells. Killing a sprite removes it from the index as well.
+
+    Attributes:
+        grid (SpatialGrid): The spatial index of the sprites.
+    """
+
+    def __init__(
+            self,
+            cell_size: int,
+            moving: Tuple[Type[pygame.sprite.Sprite], ...] = ()
+        ) -> None:
+        """Initializes the SpatialGroup class
+
+        Args:
+            cell_size (int): The size of a cell of the grid in pixels.
+            moving (Tuple[Type[pygame.sprite.Sprite], ...], optional): The classes of the sprites
+                that move. Defaults to no class, every sprite being static.
+        """
+        super().__init__()
+        self.grid = SpatialGrid(cell_size)
+        self._moving_types = moving
+        self._pending: Dict[pygame.sprite.Sprite, None] = {}
+        self._moving: Dict[pygame.sprite.Sprite, None] = {}
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None) -> None:
+        """Adds the sprite to the group, it is indexed on the next query once its rect is set"""
+        super().add_internal(sprite, layer)
+        self._pending[sprite] = None
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        """Removes the sprite from the group and from the spatial index"""
+        super().remove_internal(sprite)
+        self._pending.pop(sprite, None)
+        self._moving.pop(sprite, None)
+        self.grid.remove(sprite)
+
+    def _refresh(self) -> None:
+        """Indexes the newly added sprites and moves the moving ones to their current cells"""
+        for sprite in self._pending:
+            if isinstance(sprite, self._moving_types):
+                self._moving[sprite] = None
+            self.grid.insert(sprite)
+        self._pending.clear()
+
+        for sprite in self._moving:
+            self.grid.move(sprite)
+
+    def collide(self, sprite: pygame.sprite.Sprite) -> List[pygame.sprite.Sprite]:
+        """Returns the sprites of the group colliding with a sprite
+
+        Equivalent of `pygame.sprite.spritecollide` without killing, only looking at the sprites
+        in the cells overlapped by the sprite instead of the whole group.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to collide, its rect is used.
+
+        Returns:
+            List[pygame.sprite.Sprite]: The sprites of the group whose rect overlaps the sprite.
+        """
+        self._refresh()
+        return self.grid.query(sprite.rect)
+
+
+class DepthSortedGrid(SpatialGrid):
+    """A spatial grid of static sprites whose cells are kept sorted by depth
+
+    Each cell holds its sprites sorted by `(rect.centery, order)`, the order being the insertion
+    rank given by the owner of the grid to break the ties. A query merges the presorted cells
+    overlapping the area, so the static sprites in view come out in drawing order without sorting
+    them every frame. The sprites are expected to be static: moving one with `move` re-inserts it at
+    its new depth, which costs more than the moves of a plain `SpatialGrid`.
+    """
+
+    def __init__(self, cell_size: int) -> None:
+        """Initializes the DepthSortedGrid class
+
+        Args:
+            cell_size (int): The size of a cell in pixels.
+        """
+        super().__init__(cell_size)
+
+        self._sorted_cells: Dict[Tuple[int, int], List[Tuple[int, int, pygame.sprite.Sprite]]] = {}
+        self._keys: Dict[pygame.sprite.Sprite, Tuple[int, int]] = {}
+
+    def insert(self, sprite: pygame.sprite.Sprite, order: int = 0) -> None:
+        """Registers a sprite in the cells covered by its rectangle, at its depth
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to index.
+            order (int, optional): The rank breaking the ties between sprites of the same depth.
+                Defaults to 0.
+        """
+        span = self._span(sprite.rect)
+        key = (sprite.rect.centery, order)
+        self._spans[sprite] = span
+        self._keys[sprite] = key
+        for cell in self._cells_of(span):
+            insort(self._sorted_cells.setdefault(cell, []), (*key, sprite))
+
+    def remove(self, sprite: pygame.sprite.Sprite) -> None:
+        """Unregisters a sprite from the index, if it is indexed
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to remove.
+        """
+        span = self._spans.pop(sprite, None)
+        if span is None:
+            return
+
+        key = self._keys.pop(sprite)
+        for cell in self._cells_of(span):
+            bucket = self._sorted_cells[cell]
+            del bucket[bisect_left(bucket, key)]
+            if not bucket:
+                del self._sorted_cells[cell]
+
+    def move(self, sprite: pygame.sprite.Sprite) -> None:
+        """Updates the cells and depth of a sprite after its rectangle moved, keeping its order
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite that moved.
+        """
+        key = self._keys.get(sprite)
+        if key is None:
+            return
+
+        if key[0] != sprite.rect.centery or self._spans[sprite] != self._span(sprite.rect):
+            self.remove(sprite)
+            self.insert(sprite, key[1])
+
+    def query_sorted(self, rect: pygame.Rect) -> Iterator[Tuple[int, int, pygame.sprite.Sprite]]:
+        """Yields the indexed sprites overlapping the given rectangle, sorted by depth
+
+        Args:
+            rect (pygame.Rect): The area to query.
+
+        Yields:
+            Tuple[int, int, pygame.sprite.Sprite]: The depth, the order and the sprite.
+        """
+        buckets = [
+            self._sorted_cells[cell] for cell in self._cells_of(self._span(rect))
+            if cell in self._sorted_cells
+        ]
+
+        previous = None
+        for entry in merge(*buckets):
+            # A sprite spanning several cells comes out of each of them in a row
+            if entry[2] is not previous and rect.colliderect(entry[2].rect):
+                yield entry
+            previous = entry[2]
+
+    def query(self, rect: pygame.Rect) -> List[pygame.sprite.Sprite]:
+        return [entry[2] for entry in self.query_sorted(rect)]
+
+    def clear(self) -> None:
+        super().clear()
+        self._sorted_cells.clear()
+        self._keys.clear()
+
+
+def merge_by_depth(*entries: Iterable[Tuple[int, int, pygame.Surface, int, int]]) -> Iterator[
+        Tuple[pygame.Surface, int, int]]:
+    """Merges sorted `(depth, order, image, x, y)` sequences into a single drawing order
+
+    Args:
+        *entries (Iterable[Tuple[int, int, pygame.Surface, int, int]]): The sequences sorted by
+            depth, giving the surface to draw and its position.
+
+    Yields:
+        Tuple[pygame.Surface, int, int]: The surfaces and their positions, from the back to the
+            front.
+    """
+    for _, _, image, x_pos, y_pos in merge(*entries, key=lambda entry: entry[:2]):
+        yield image, x_pos, y_pos
@@ -0,0 +1,216 @@
+"""Chunked streaming of the level for maps much larger than the screen"""
+from __future__ import absolute_import
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pygame
+
+from .config import config
+from .utils.assets import assets
+from .utils.map_compiler import CompiledMap
+
+
+Chunk = Tuple[int, int]
+Cell = Tuple[int, int]
+
+
+class ChunkState:
+    """The persisted state of a chunk, kept while the chunk is unloaded
+
+    Attributes:
+        cut_grass (Set[Cell]): The cells whose grass was cut.
+        grass_surfaces (Dict[Cell, pygame.Surface]): The surface drawn for each grass cell, so that
+            the grass looks the same when the chunk is built again.
+        spawned (bool): Whether the enemies of the map spawns of the chunk were created.
+        enemies (List[dict]): The enemies persisted in the chunk while it is unloaded.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the state of a chunk never built"""
+        self.cut_grass: Set[Cell] = set()
+        self.grass_surfaces: Dict[Cell, pygame.Surface] = {}
+        self.spawned = False
+        self.enemies: List[dict] = []
+
+
+class ChunkStreamer:
+    """Builds the chunks of the map around the camera and releases the far away ones
+
+    The map is split in square chunks of `config.chunk_size` tiles. Each frame:
+        - the chunks overlapping the screen are built right away if they are missing,
+        - the chunks within `config.chunk_load_margin` of the screen, shifted ahead of the player by
+          `config.chunk_lookahead`, are queued and built at most `config.chunk_build_budget` per
+          frame, nearest first, so that they are ready before they come into view,
+        - the chunks further than `config.chunk_unload_margin` are released.
+
+    The state of a released chunk (cut grass, surviving enemies with their health and position) is
+    persisted and restored when the chunk is built again.
+    """
+
+    def __init__(
+            self,
+            compiled_map: CompiledMap,
+            create_cell: Callable[..., pygame.sprite.Sprite],
+            styles: Optional[Iterable[str]] = None
+        ) -> None:
+        """Initializes the ChunkStreamer class
+
+        Buckets the non-empty cells of the map by chunk and creates the player right away.
+
+        Args:
+            compiled_map (CompiledMap): The map to stream.
+            create_cell (Callable): Function creating the sprite of a map cell, called with the
+                style, the column, the row, the value and optionally the surface of the cell.
+            styles (Iterable[str], optional): The layers of the map streamed. Defaults to every
+                layer of `config.map_layers`.
+        """
+        self.create_cell = create_cell
+        self.chunk_pixels = config.chunk_size * config.tilesize
+        self.chunk_cols = -(-compiled_map.cols // config.chunk_size)
+        self.chunk_rows = -(-compiled_map.rows // config.chunk_size)
+
+        self._cells: Dict[Chunk, List[Tuple[str, int, int, int]]] = {}
+        for style in config.map_layers if styles is None else styles:
+            for col_index, row_index, value in compiled_map.cells(style):
+                if style == 'entities' and str(value) == config.player_tile_id:
+                    self.create_cell(style, col_index, row_index, value)
+                    continue
+
+                chunk = (col_index // config.chunk_size, row_index // config.chunk_size)
+                self._cells.setdefault(chunk, []).append((style, col_index, row_index, value))
+
+        self._states: Dict[Chunk, ChunkState] = {}
+        self._loaded: Dict[Chunk, List[pygame.sprite.Sprite]] = {}
+        self._enemy_values: Dict[pygame.sprite.Sprite, int] = {}
+
+    @property
+    def loaded_chunks(self) -> List[Chunk]:
+        """The chunks currently built"""
+        return list(self._loaded)
+
+    def _chunk_of(self, pos: Tuple[float, float]) -> Chunk:
+        return int(pos[0] // self.chunk_pixels), int(pos[1] // self.chunk_pixels)
+
+    def _chunks_in(self, rect: pygame.Rect) -> Iterator[Chunk]:
+        """Yields the chunks of the map overlapped by a rectangle"""
+        col_start = max(rect.left // self.chunk_pixels, 0)
+        col_end = min((rect.right - 1) // self.chunk_pixels, self.chunk_cols - 1)
+        row_start = max(rect.top // self.chunk_pixels, 0)
+        row_end = min((rect.bottom - 1) // self.chunk_pixels, self.chunk_rows - 1)
+
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                yield col, row
+
+    def _state(self, chunk: Chunk) -> ChunkState:
+        if chunk not in self._states:
+            self._states[chunk] = ChunkState()
+        return self._states[chunk]
+
+    def _build(self, chunk: Chunk) -> None:
+        """Creates the sprites of a chunk from the map and its persisted state"""
+        state = self._state(chunk)
+        sprites = []
+
+        for style, col_index, row_index, value in self._cells.get(chunk, ()):
+            cell = (col_index, row_index)
+            if style == 'grass':
+                if cell in state.cut_grass:
+                    continue
+                sprite = self.create_cell(
+                    style, col_index, row_index, value, state.grass_surfaces.get(cell)
+                )
+                state.grass_surfaces[cell] = sprite.image
+                sprites.append(sprite)
+            elif style == 'entities':
+                if not state.spawned:
+                    self._enemy_values[self.create_cell(style, col_index, row_index, value)] = value
+            else:
+                sprites.append(self.create_cell(style, col_index, row_index, value))
+
+        # Enemies persisted when the chunk was released
+        state.spawned = True
+        for record in state.enemies:
+            col_index, row_index = (int(coord // config.tilesize) for coord in record['pos'])
+            enemy = self.create_cell('entities', col_index, row_index, record['value'])
+            enemy.place(record['pos'])
+            enemy.health = record['health']
+            self._enemy_values[enemy] = record['value']
+        state.enemies = []
+
+        self._loaded[chunk] = sprites
+
+    def _capture(self, enemy: pygame.sprite.Sprite) -> None:
+        """Persists an enemy in the state of the chunk it stands in and removes it"""
+        chunk = self._chunk_of(enemy.hitbox.center)
+        self._state(chunk).enemies.append({
+            'value': self._enemy_values.pop(enemy),
+            'pos': enemy.hitbox.center,
+            'health': enemy.health
+        })
+        enemy.kill()
+
+    def _release(self, chunk: Chunk) -> None:
+        """Persists the enemies standing in a chunk and kills all its sprites"""
+        for enemy in list(self._enemy_values):
+            if not enemy.alive():
+                del self._enemy_values[enemy]
+            elif self._chunk_of(enemy.hitbox.center) == chunk:
+                self._capture(enemy)
+
+        for sprite in self._loaded.pop(chunk):
+            sprite.kill()
+
+    def mark_cut(self, tile: pygame.sprite.Sprite) -> None:
+        """Records that a grass tile was cut, so that it is not built again
+
+        Args:
+            tile (pygame.sprite.Sprite): The grass tile being cut.
+        """
+        cell = (tile.rect.left // config.tilesize, tile.rect.top // config.tilesize)
+        chunk = (cell[0] // config.chunk_size, cell[1] // config.chunk_size)
+        self._state(chunk).cut_grass.add(cell)
+
+    def update(self, player: pygame.sprite.Sprite) -> None:
+        """Builds and releases the chunks around the camera
+
+        Args:
+            player (pygame.sprite.Sprite): The player, followed by the camera.
+        """
+        view = pygame.Rect(0, 0, config.width, config.height)
+        view.center = player.rect.center
+
+        # The chunks in view can not wait
+        for chunk in self._chunks_in(view):
+            if chunk not in self._loaded:
+                self._build(chunk)
+
+        # The chunks ahead of the player are built within the frame budget
+        ahead = view.inflate(config.chunk_load_margin * 2, config.chunk_load_margin * 2)
+        ahead.move_ip(player.direction * config.chunk_lookahead)
+        queue = sorted(
+            (chunk for chunk in self._chunks_in(ahead) if chunk not in self._loaded),
+            key=lambda chunk: ((chunk[0] + 0.5) * self.chunk_pixels - ahead.centerx) ** 2 + \
+                ((chunk[1] + 0.5) * self.chunk_pixels - ahead.centery) ** 2
+        )
+        for chunk in queue[:config.chunk_build_budget]:
+            self._build(chunk)
+
+        # The far away chunks are released
+        keep = set(self._chunks_in(
+            view.inflate(config.chunk_unload_margin * 2, config.chunk_unload_margin * 2)
+        ))
+        released = [chunk for chunk in self._loaded if chunk not in keep]
+        for chunk in released:
+            self._release(chunk)
+
+        # The animations of the enemies left behind are evicted, freeing their atlas pages
+        if released:
+            assets.trim()
+
+        # Dead enemies are forgotten, the ones wandering out of the built chunks are persisted
+        for enemy in list(self._enemy_values):
+            if not enemy.alive():
+                del self._enemy_values[enemy]
+            elif self._chunk_of(enemy.hitbox.center) not in self._loaded:
+                self._capture(enemy)
@@ -26,7 +26,7 @@ class Tile(pygame.sprite.Sprite):
             sprite_type: Type of sprite.
             surface (pygame.Surface): Surface to represent the tile (default is a blank surface).
         """
-        super().__init__(groups)
+        super().__init__()
 
         self.sprite_type = sprite_type
 
@@ -37,3 +37,6 @@ class Tile(pygame.sprite.Sprite):
         else:
             self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(0, -10)
+
+        # Joining the groups once the hitbox is known, the collision grid indexes it
+        self.add(groups)
@@ -0,0 +1,247 @@
+"""Compact storage of the static tiles of the map (boundaries, grass and objects)"""
+from __future__ import absolute_import
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pygame
+
+from .collision import CollisionGrid
+from .config import config
+
+
+STYLES = ('boundary', 'grass', 'object')
+NO_TILE = -1
+
+# The invisible boundary tiles block a whole tile, as a default Tile does
+BOUNDARY_SIZE = (config.tilesize, config.tilesize)
+
+
+class TileKind:
+    """The data shared by all the tiles of a style drawn with the same surface (flyweight)
+
+    Attributes:
+        style (str): The layer of the tiles ('boundary', 'grass' or 'object').
+        image (Optional[pygame.Surface]): The surface drawn, None for the invisible tiles.
+        rect (pygame.Rect): The rect of a tile relative to the top left corner of its cell.
+        hitbox (pygame.Rect): The hitbox of a tile relative to the top left corner of its cell.
+    """
+
+    def __init__(self, style: str, image: Optional[pygame.Surface]) -> None:
+        """Initializes the TileKind class
+
+        The rect and hitbox are the ones of a `Tile` sprite: the objects stand on the cell below
+        their top left corner, and the hitbox is the rect shrunk by 10 pixels vertically.
+
+        Args:
+            style (str): The layer of the tiles.
+            image (Optional[pygame.Surface]): The surface drawn, None for the invisible tiles.
+        """
+        self.style = style
+        self.image = image
+
+        size = BOUNDARY_SIZE if image is None else image.get_size()
+        top = -config.tilesize if style == 'object' else 0
+        self.rect = pygame.Rect((0, top), size)
+        self.hitbox = self.rect.inflate(0, -10)
+
+
+class TileLayer:
+    """The static tiles of the map, stored in typed arrays indexed by cell instead of as sprites
+
+    Each layer keeps, for every cell of the map, the index of the kind of its tile or `NO_TILE`.
+    The kinds are flyweights holding the surface, rect and hitbox shared by their tiles, so a tile
+    only costs a couple of bytes whatever its style. A cut grass tile is simply cleared.
+
+    The hitboxes of the tiles are registered in the occupancy of the collision grid, which asks the
+    layer for them when an entity gets close. The tiles in view are drawn by the camera with the
+    sprites, and the grass hit by an attack is cut through `cut_grass`.
+
+    Attributes:
+        cols (int): The number of columns of the map.
+        rows (int): The number of rows of the map.
+        kinds (List[TileKind]): The kinds of tiles, indexed by the values of the layers.
+        layers (Dict[str, array]): The kind index of the tile of each cell, for each style.
+    """
+
+    def __init__(self, obstacles: CollisionGrid) -> None:
+        """Initializes the TileLayer class
+
+        Args:
+            obstacles (CollisionGrid): The collision grid of the map, the tiles are registered in
+                it and it gets their hitboxes from the layer.
+        """
+        self.obstacles = obstacles
+        self.cols = obstacles.cols
+        self.rows = obstacles.rows
+        self.tilesize = obstacles.tilesize
+
+        self.kinds: List[TileKind] = []
+        self._kind_indexes: Dict[Tuple[str, Optional[pygame.Surface]], int] = {}
+        self.layers = {style: array('h', [NO_TILE]) * (self.cols * self.rows) for style in STYLES}
+        self._count = 0
+
+        # The extent of the rects of every kind around their cell, to find the tiles of an area
+        self._reach = pygame.Rect(0, 0, self.tilesize, self.tilesize)
+
+        obstacles.tiles = self
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _kind(self, style: str, image: Optional[pygame.Surface]) -> int:
+        """Returns the index of the kind of a style and surface, creating it on first use"""
+        key = (style, image)
+        if key not in self._kind_indexes:
+            kind = TileKind(style, image)
+            self._kind_indexes[key] = len(self.kinds)
+            self.kinds.append(kind)
+            self._reach.union_ip(kind.rect)
+        return self._kind_indexes[key]
+
+    def _hitbox(self, kind: TileKind, cell: int) -> pygame.Rect:
+        return kind.hitbox.move(
+            cell % self.cols * self.tilesize,
+            cell // self.cols * self.tilesize
+        )
+
+    def _rect(self, kind: TileKind, cell: int) -> pygame.Rect:
+        return kind.rect.move(
+            cell % self.cols * self.tilesize,
+            cell // self.cols * self.tilesize
+        )
+
+    def place(
+            self,
+            style: str,
+            col_index: int,
+            row_index: int,
+            image: Optional[pygame.Surface] = None
+        ) -> None:
+        """Puts a tile in a cell, replacing the tile of the same style if any
+
+        Args:
+            style (str): The layer of the tile ('boundary', 'grass' or 'object').
+            col_index (int): The column of the cell.
+            row_index (int): The row of the cell.
+            image (pygame.Surface, optional): The surface of the tile. Defaults to None, for the
+                invisible boundary tiles.
+        """
+        cell = row_index * self.cols + col_index
+        self.remove(style, cell)
+
+        index = self._kind(style, image)
+        self.layers[style][cell] = index
+        self.obstacles.add_static(self._hitbox(self.kinds[index], cell))
+        self._count += 1
+
+    def remove(self, style: str, cell: int) -> None:
+        """Clears the tile of a style in a cell, if there is one
+
+        Args:
+            style (str): The layer of the tile.
+            cell (int): The index of the cell, `row * cols + col`.
+        """
+        index = self.layers[style][cell]
+        if index == NO_TILE:
+            return
+
+        self.layers[style][cell] = NO_TILE
+        self.obstacles.remove_static(self._hitbox(self.kinds[index], cell))
+        self._count -= 1
+
+    def clear(self) -> None:
+        """Removes every tile"""
+        for style, layer in self.layers.items():
+            for cell, index in enumerate(layer):
+                if index != NO_TILE:
+                    self.remove(style, cell)
+
+    def _cells(self, rect: pygame.Rect) -> Iterator[int]:
+        """Yields the cells whose tiles may overlap a rectangle, clamped to the map"""
+        reach, size = self._reach, self.tilesize
+        col_start = max((rect.left - reach.right) // size, 0)
+        col_end = min((rect.right - 1 - reach.left) // size, self.cols - 1)
+        row_start = max((rect.top - reach.bottom) // size, 0)
+        row_end = min((rect.bottom - 1 - reach.top) // size, self.rows - 1)
+
+        for row in range(row_start, row_end + 1):
+            offset = row * self.cols
+            for col in range(col_start, col_end + 1):
+                yield offset + col
+
+    def hitboxes(self, rect: pygame.Rect) -> List[pygame.Rect]:
+        """Returns the hitboxes of the tiles colliding with a rectangle
+
+        Args:
+            rect (pygame.Rect): The rectangle to query, usually the hitbox of an entity.
+
+        Returns:
+            List[pygame.Rect]: The hitboxes, built on demand.
+        """
+        hitboxes = []
+        layers = [self.layers[style] for style in STYLES]
+        for cell in self._cells(rect):
+            for layer in layers:
+                index = layer[cell]
+                if index != NO_TILE:
+                    hitbox = self._hitbox(self.kinds[index], cell)
+                    if hitbox.colliderect(rect):
+                        hitboxes.append(hitbox)
+
+        return hitboxes
+
+    def cut_grass(self, rect: pygame.Rect) -> List[Tuple[int, int]]:
+        """Cuts the grass tiles overlapping a rectangle
+
+        Args:
+            rect (pygame.Rect): The area hit, usually the rect of an attack.
+
+        Returns:
+            List[Tuple[int, int]]: The centers of the grass tiles cut.
+        """
+        cut = []
+        layer = self.layers['grass']
+        for cell in self._cells(rect):
+            index = layer[cell]
+            if index != NO_TILE:
+                tile_rect = self._rect(self.kinds[index], cell)
+                if tile_rect.colliderect(rect):
+                    self.remove('grass', cell)
+                    cut.append(tile_rect.center)
+
+        return cut
+
+    def query_sorted(self, rect: pygame.Rect) -> List[Tuple[int, int, pygame.Surface, int, int]]:
+        """Returns the visible tiles overlapping a rectangle, sorted by depth
+
+        The tiles are ordered before every sprite of the same depth, as the map sprites created
+        first used to be.
+
+        Args:
+            rect (pygame.Rect): The area to query, usually the camera.
+
+        Returns:
+            List[Tuple[int, int, pygame.Surface, int, int]]: The depth, the order, the surface and
+                the position of each tile.
+        """
+        entries = []
+        base_order = -len(STYLES) * self.cols * self.rows
+        for rank, style in enumerate(STYLES[1:], 1):
+            layer = self.layers[style]
+            for cell in self._cells(rect):
+                index = layer[cell]
+                if index != NO_TILE:
+                    kind = self.kinds[index]
+                    tile_rect = self._rect(kind, cell)
+                    if tile_rect.colliderect(rect):
+                        entries.append((
+                            tile_rect.centery,
+                            base_order + cell * len(STYLES) + rank,
+                            kind.image,
+                            tile_rect.x,
+                            tile_rect.y
+                        ))
+
+        entries.sort(key=lambda entry: entry[:2])
+        return entries
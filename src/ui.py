@@ -5,6 +5,7 @@ import pygame
 
 from .player import Player
 from .config import config
+from .utils.assets import assets
 
 
 class UI:
@@ -42,7 +43,7 @@ class UI:
         self.weapon_graphics = []
         for weapon in config.weapon_data.values():
             weapon_img_path = weapon['graphic']
-            weapon_img = pygame.image.load(weapon_img_path).convert_alpha()
+            weapon_img = assets.image(weapon_img_path)
 
             self.weapon_graphics.append(weapon_img)
 
@@ -50,7 +51,7 @@ class UI:
         self.magic_graphics = []
         for magic in config.magic_data.values():
             magic_img_path = magic['graphic']
-            magic_img = pygame.image.load(magic_img_path).convert_alpha()
+            magic_img = assets.image(magic_img_path)
 
             self.magic_graphics.append(magic_img)
 
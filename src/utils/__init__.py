@@ -5,4 +5,11 @@ this application
 """
 from __future__ import absolute_import
 
-from .utils import import_csv_layout, import_image_from_folder
+from .assets import AssetRegistry, assets
+from .atlas import Atlas, atlas, frame_rect
+from .utils import (
+    blit_batch,
+    import_csv_layout,
+    import_frames_from_folder,
+    import_image_from_folder
+)
@@ -0,0 +1,214 @@
+"""Process-wide registry of the loaded image assets
+
+Every image and animation folder is loaded and converted once, then shared by all the sprites using
+it. The entries are reference counted: the sprites owning assets release them when they die, and the
+unreferenced entries are only evicted on demand with `trim`, so that short lived sprites (e.g. the
+weapons) do not reload their images on every use.
+
+The animation frames can also be requested packed in the texture atlas (`frames`), they are then
+cached separately from the plain folder of the same path.
+"""
+from __future__ import absolute_import
+
+import re
+from os import listdir
+from os.path import isdir, isfile, join, normpath
+from typing import Callable, Dict, Iterable, List, Union
+
+import pygame
+
+from .atlas import atlas
+
+
+ATLAS_PREFIX = 'atlas:'
+
+Asset = Union[pygame.Surface, List[pygame.Surface]]
+
+
+def _natural_key(name: str) -> List[Union[int, str]]:
+    """Sorting key ordering the numbered frames naturally ('2.png' before '10.png')"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def _surface_bytes(surface: pygame.Surface) -> int:
+    """Returns the size in bytes of the pixels of a surface, subsurfaces only count their area"""
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+class AssetRegistry:
+    """A cache of the loaded surfaces, keyed by normalized path
+
+    Attributes:
+        hits (int): The number of requests served from the cache.
+        misses (int): The number of requests that had to load from disk.
+        load_hooks (List[Callable]): Functions called with the path and the asset after each load.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the AssetRegistry class"""
+        self._assets: Dict[str, Asset] = {}
+        self._refs: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.load_hooks: List[Callable[[str, Asset], None]] = []
+
+    @staticmethod
+    def _key(path: str, frames: bool = False) -> str:
+        """Returns the cache key of a path, atlas frames having their own entries"""
+        key = normpath(path)
+        return ATLAS_PREFIX + key if frames else key
+
+    def _get(self, key: str, loader: Callable[[], Asset]) -> Asset:
+        """Returns a cached asset, loading it on a miss, and takes a reference on it"""
+        if key in self._assets:
+            self.hits += 1
+        else:
+            self.misses += 1
+            asset = loader()
+            self._assets[key] = asset
+            self._refs[key] = 0
+            surfaces = asset if isinstance(asset, list) else [asset]
+            self._bytes[key] = sum(_surface_bytes(surface) for surface in surfaces)
+
+            for hook in self.load_hooks:
+                hook(key, asset)
+
+        self._refs[key] += 1
+        return self._assets[key]
+
+    @staticmethod
+    def _load_image(path: str) -> pygame.Surface:
+        surface = pygame.image.load(path)
+        # Without a display (headless mode), the surfaces are kept in their file format
+        if pygame.display.get_surface() is None:
+            return surface
+        return surface.convert_alpha()
+
+    @classmethod
+    def _load_folder(cls, path: str) -> List[pygame.Surface]:
+        img_files = sorted((f for f in listdir(path) if isfile(join(path, f))), key=_natural_key)
+        return [cls._load_image(join(path, f)) for f in img_files]
+
+    def image(self, path: str) -> pygame.Surface:
+        """Returns the shared surface of an image file
+
+        Args:
+            path (str): The path of the image.
+
+        Returns:
+            pygame.Surface: The converted surface, shared with every other user of the image.
+        """
+        key = self._key(path)
+        return self._get(key, lambda: self._load_image(key))
+
+    def folder(self, path: str) -> List[pygame.Surface]:
+        """Returns the shared frames of an animation folder, in natural file name order
+
+        Args:
+            path (str): The path of the folder containing the frames.
+
+        Returns:
+            List[pygame.Surface]: The converted frames, shared with every other user of the folder.
+                The list must not be modified.
+        """
+        key = self._key(path)
+        return self._get(key, lambda: self._load_folder(key))
+
+    def frames(self, path: str) -> List[pygame.Surface]:
+        """Returns the shared frames of an animation folder, trimmed and packed in the atlas
+
+        The frames are subsurfaces of the atlas pages, `atlas.frame_rect` gives their untrimmed rect
+        and `atlas.offsets` the offset to draw them at.
+
+        Args:
+            path (str): The path of the folder containing the frames.
+
+        Returns:
+            List[pygame.Surface]: The packed frames, in natural file name order. The list must not
+                be modified.
+        """
+        folder_path = normpath(path)
+        return self._get(
+            self._key(path, frames=True),
+            lambda: atlas.pack(self._load_folder(folder_path))
+        )
+
+    def preload(self, paths: Iterable[str], frames: bool = False) -> None:
+        """Loads assets ahead of their first use, without taking a reference on them
+
+        Args:
+            paths (Iterable[str]): The paths of the image files or animation folders to load.
+            frames (bool, optional): Whether the folders are loaded as atlas frames. Defaults to
+                False.
+        """
+        for path in paths:
+            if not isdir(path):
+                self.image(path)
+                self._refs[self._key(path)] -= 1
+            elif frames:
+                self.frames(path)
+                self._refs[self._key(path, frames=True)] -= 1
+            else:
+                self.folder(path)
+                self._refs[self._key(path)] -= 1
+
+    def release(self, path: str, frames: bool = False) -> None:
+        """Drops a reference on an asset, it stays cached until the next `trim`
+
+        Args:
+            path (str): The path of the image file or animation folder.
+            frames (bool, optional): Whether the asset was requested as atlas frames. Defaults to
+                False.
+        """
+        key = self._key(path, frames)
+        if self._refs.get(key, 0) > 0:
+            self._refs[key] -= 1
+
+    def trim(self) -> int:
+        """Evicts the assets no longer referenced
+
+        The evicted atlas frames are released from the atlas, freeing the pages left empty.
+
+        Returns:
+            int: The number of bytes released.
+        """
+        released = 0
+        for key in [key for key, refs in self._refs.items() if refs == 0]:
+            released += self._bytes.pop(key)
+            asset = self._assets.pop(key)
+            del self._refs[key]
+            if key.startswith(ATLAS_PREFIX):
+                atlas.release(asset)
+
+        return released
+
+    def clear(self) -> None:
+        """Evicts every asset and resets the statistics, releasing the atlas frames"""
+        for key, asset in self._assets.items():
+            if key.startswith(ATLAS_PREFIX):
+                atlas.release(asset)
+        self._assets.clear()
+        self._refs.clear()
+        self._bytes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache statistics
+
+        Returns:
+            Dict[str, int]: The hits, misses, number of cached entries, number of referenced entries
+                and bytes held by the cache.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._assets),
+            'referenced': sum(1 for refs in self._refs.values() if refs > 0),
+            'bytes': sum(self._bytes.values())
+        }
+
+
+assets = AssetRegistry()
@@ -0,0 +1,214 @@
+"""Texture atlas packing the animation frames into shared surfaces
+
+Each frame is trimmed to its opaque bounding box and copied on an atlas page, the frame handed out
+being a subsurface of that page. The position of the trimmed area in the original frame and the
+original size are kept, so that:
+    - the sprites keep rects of the original frame size (`frame_rect`), the gameplay, the culling
+      and the depth sorting are not affected by the trimming,
+    - the drawing code shifts each frame by its trim offset (`Atlas.offsets`).
+
+The frames packed on each page are counted. Released frames (`Atlas.release`) free their page once
+it holds no frame anymore, so that the pages do not pile up as animations are loaded and evicted.
+"""
+from __future__ import absolute_import
+
+from typing import Dict, List, Tuple
+
+import pygame
+
+from src.config import config
+
+
+class Atlas:
+    """A set of atlas pages filled with a shelf packer
+
+    Attributes:
+        page_size (int): The size in pixels of a (square) atlas page.
+        pages (List[pygame.Surface]): The atlas pages.
+        offsets (Dict[pygame.Surface, Tuple[int, int]]): The trim offset of each packed frame.
+        sizes (Dict[pygame.Surface, Tuple[int, int]]): The original size of each packed frame.
+    """
+
+    def __init__(self, page_size: int = config.atlas_page_size, padding: int = 1) -> None:
+        """Initializes the Atlas class
+
+        Args:
+            page_size (int, optional): The size of an atlas page. Defaults to
+                config.atlas_page_size.
+            padding (int, optional): The empty pixels left between two frames. Defaults to 1.
+        """
+        self.page_size = page_size
+        self.padding = padding
+
+        self.pages: List[pygame.Surface] = []
+        self.offsets: Dict[pygame.Surface, Tuple[int, int]] = {}
+        self.sizes: Dict[pygame.Surface, Tuple[int, int]] = {}
+
+        # Number of frames packed on each page and not released
+        self._live: Dict[pygame.Surface, int] = {}
+
+        # Shelf packer cursor: position in the current shelf and height of the shelf
+        self._cursor_x = 0
+        self._cursor_y = 0
+        self._shelf_height = 0
+
+    def _new_page(self) -> None:
+        page = pygame.Surface((self.page_size, self.page_size), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            page = page.convert_alpha()
+        self.pages.append(page)
+        self._live[page] = 0
+        self._cursor_x = self._cursor_y = self._shelf_height = 0
+
+    def _allocate(self, width: int, height: int) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Finds room for a frame, on the current shelf, a new shelf or a new page"""
+        padded_width = width + self.padding
+        padded_height = height + self.padding
+
+        if not self.pages:
+            self._new_page()
+
+        if self._cursor_x + padded_width > self.page_size:
+            self._cursor_x = 0
+            self._cursor_y += self._shelf_height
+            self._shelf_height = 0
+
+        if self._cursor_y + padded_height > self.page_size:
+            self._new_page()
+
+        area = pygame.Rect(self._cursor_x, self._cursor_y, width, height)
+        self._cursor_x += padded_width
+        self._shelf_height = max(self._shelf_height, padded_height)
+
+        return self.pages[-1], area
+
+    def pack(self, frames: List[pygame.Surface]) -> List[pygame.Surface]:
+        """Trims frames and copies them on the atlas pages
+
+        Frames larger than a page are kept as they are.
+
+        Args:
+            frames (List[pygame.Surface]): The frames to pack.
+
+        Returns:
+            List[pygame.Surface]: The packed frames, as subsurfaces of the atlas pages.
+        """
+        packed = []
+        for frame in frames:
+            opaque = frame.get_bounding_rect()
+            if not opaque.width or not opaque.height:
+                opaque = pygame.Rect(0, 0, 1, 1)
+
+            if opaque.width > self.page_size or opaque.height > self.page_size:
+                packed.append(frame)
+                continue
+
+            page, area = self._allocate(opaque.width, opaque.height)
+            page.blit(frame, area, opaque)
+
+            subsurface = page.subsurface(area)
+            self.offsets[subsurface] = opaque.topleft
+            self.sizes[subsurface] = frame.get_size()
+            self._live[page] += 1
+            packed.append(subsurface)
+
+        return packed
+
+    def release(self, frames: List[pygame.Surface]) -> None:
+        """Forgets frames no longer used, packed or derived, and frees the pages left empty
+
+        An empty page is dropped, except the page being filled which is cleared and filled again
+        from its top.
+
+        Args:
+            frames (List[pygame.Surface]): The frames to forget.
+        """
+        for frame in frames:
+            if self.offsets.pop(frame, None) is None:
+                continue
+            del self.sizes[frame]
+
+            page = frame.get_parent()
+            if page not in self._live:
+                # A derived surface, or a frame too large to be packed
+                continue
+
+            self._live[page] -= 1
+            if self._live[page]:
+                continue
+
+            if page is self.pages[-1]:
+                page.fill((0, 0, 0, 0))
+                self._cursor_x = self._cursor_y = self._shelf_height = 0
+            else:
+                self.pages.remove(page)
+                del self._live[page]
+
+    def derive(self, surface: pygame.Surface, source: pygame.Surface, flip_x: bool = False) -> None:
+        """Registers a surface computed from a packed frame (e.g. a flipped copy)
+
+        Args:
+            surface (pygame.Surface): The computed surface, of the size of the source.
+            source (pygame.Surface): The packed frame it was computed from.
+            flip_x (bool, optional): Whether the surface is the horizontal mirror of the source.
+                Defaults to False.
+        """
+        if source not in self.offsets:
+            return
+
+        offset_x, offset_y = self.offsets[source]
+        full_width, full_height = self.sizes[source]
+        if flip_x:
+            offset_x = full_width - offset_x - source.get_width()
+
+        self.offsets[surface] = (offset_x, offset_y)
+        self.sizes[surface] = (full_width, full_height)
+
+    def flip(self, frames: List[pygame.Surface]) -> List[pygame.Surface]:
+        """Returns the horizontal mirrors of frames, keeping their trim information
+
+        Args:
+            frames (List[pygame.Surface]): The frames to flip.
+
+        Returns:
+            List[pygame.Surface]: The flipped frames.
+        """
+        flipped_frames = []
+        for frame in frames:
+            flipped_frame = pygame.transform.flip(frame, True, False)
+            self.derive(flipped_frame, frame, flip_x=True)
+            flipped_frames.append(flipped_frame)
+
+        return flipped_frames
+
+    def frame_rect(self, surface: pygame.Surface, **anchors) -> pygame.Rect:
+        """Returns the rect of the original, untrimmed frame
+
+        Args:
+            surface (pygame.Surface): The frame.
+            **anchors: The rect attributes to set, as for `Surface.get_rect`.
+
+        Returns:
+            pygame.Rect: The rect of the frame before trimming, placed according to the anchors.
+        """
+        size = self.sizes.get(surface)
+        if size is None:
+            return surface.get_rect(**anchors)
+
+        rect = pygame.Rect((0, 0), size)
+        for name, value in anchors.items():
+            setattr(rect, name, value)
+
+        return rect
+
+    def clear(self) -> None:
+        """Drops the atlas pages and the trim information"""
+        self.pages.clear()
+        self.offsets.clear()
+        self.sizes.clear()
+        self._live.clear()
+        self._cursor_x = self._cursor_y = self._shelf_height = 0
+
+
+atlas = Atlas()
+frame_rect = atlas.frame_rect
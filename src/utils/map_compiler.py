@@ -0,0 +1,283 @@
+"""Compiler of the csv map layers into a single cached binary file
+
+The csv layers are mostly made of empty cells ('-1'). The compiled file only keeps the non-empty
+cells of each layer as two flat integer arrays (cell indexes and values), which are memory-mapped at
+load time. Building a level from it scales with the number of non-empty cells instead of the map
+area times the number of layers.
+
+File layout:
+    - the magic bytes and the size of the header
+    - a json header with the map size, the sources fingerprints and the layers offsets
+    - for each layer, an array of uint32 cell indexes followed by an array of int32 values
+
+Usage:
+    python -m src.utils.map_compiler [--output PATH] [--force]
+"""
+from __future__ import absolute_import
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.config import config
+from src.utils.utils import import_csv_layout
+
+
+MAGIC = b'BOPMAP01'
+HEADER_FORMAT = '<8sI'
+EMPTY_CELL = '-1'
+
+
+def _fingerprint(path: str, with_hash: bool = True) -> Dict[str, object]:
+    """Computes the fingerprint of a source layer file
+
+    Args:
+        path (str): The path of the csv layer.
+        with_hash (bool, optional): Whether to compute the sha1 of the file. Defaults to True.
+
+    Returns:
+        Dict[str, object]: The modification time, the size and optionally the hash of the file.
+    """
+    stat = os.stat(path)
+    fingerprint = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        with open(path, 'rb') as source:
+            fingerprint['sha1'] = hashlib.sha1(source.read()).hexdigest()
+
+    return fingerprint
+
+
+def compile_map(layers: Dict[str, str], output: str) -> None:
+    """Compiles csv map layers into a single binary file
+
+    Args:
+        layers (Dict[str, str]): The path of the csv file of each layer, keyed by layer name.
+        output (str): The path of the compiled file to write.
+    """
+    header = {'cols': 0, 'rows': 0, 'layers': {}}
+    payload = bytearray()
+
+    for name, path in layers.items():
+        layout = import_csv_layout(path)
+        cols = max((len(row) for row in layout), default=0)
+        header['rows'] = max(header['rows'], len(layout))
+        header['cols'] = max(header['cols'], cols)
+
+        cells, values = [], []
+        for row_index, row in enumerate(layout):
+            for col_index, col in enumerate(row):
+                if col != EMPTY_CELL:
+                    cells.append((row_index, col_index))
+                    values.append(int(col))
+
+        header['layers'][name] = {
+            'source': path,
+            'fingerprint': _fingerprint(path),
+            'count': len(values),
+            'cells': cells,
+            'values': values
+        }
+
+    # The cells indexes can only be flattened once the width of the whole map is known
+    for layer in header['layers'].values():
+        cells = [row * header['cols'] + col for row, col in layer.pop('cells')]
+        values = layer.pop('values')
+        layer['offset'] = len(payload)
+        payload += struct.pack(f'<{len(cells)}I', *cells)
+        payload += struct.pack(f'<{len(values)}i', *values)
+
+    _write(output, header, payload)
+
+
+def _write(output: str, header: Dict[str, object], payload: bytes) -> None:
+    """Atomically writes a compiled map file from its header and payload"""
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    temp_output = f'{output}.tmp'
+    with open(temp_output, 'wb') as compiled:
+        compiled.write(struct.pack(HEADER_FORMAT, MAGIC, len(header_bytes)))
+        compiled.write(header_bytes)
+        compiled.write(payload)
+    os.replace(temp_output, output)
+
+
+class CompiledMap:
+    """A memory-mapped compiled map
+
+    Attributes:
+        cols (int): The number of columns of the map.
+        rows (int): The number of rows of the map.
+        layers (Dict[str, dict]): The header entry of each layer, keyed by layer name.
+        stale_stamps (bool): Whether `is_fresh` found sources touched but unchanged, whose
+            fingerprints should be stamped again with `restamp`.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Opens and maps a compiled map file
+
+        Args:
+            path (str): The path of the compiled map.
+
+        Raises:
+            ValueError: If the file is not a compiled map.
+        """
+        with open(path, 'rb') as compiled:
+            self._mmap = mmap.mmap(compiled.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = struct.unpack_from(HEADER_FORMAT, self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a compiled map')
+
+        start = struct.calcsize(HEADER_FORMAT)
+        header = json.loads(self._mmap[start:start + header_size].decode('utf-8'))
+        self._payload_start = start + header_size
+
+        self.cols = header['cols']
+        self.rows = header['rows']
+        self.layers = header['layers']
+        self.stale_stamps = False
+
+    def __enter__(self) -> 'CompiledMap':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Releases the memory mapping"""
+        self._mmap.close()
+
+    def is_fresh(self, layers: Dict[str, str]) -> bool:
+        """Checks that the compiled map matches the given source layers
+
+        The modification time and size of the sources are checked first, the sources are only
+        hashed when those differ. A source whose hash still matches gets its new modification time
+        and size recorded in `layers`, and `stale_stamps` is set so that they can be written back.
+
+        Args:
+            layers (Dict[str, str]): The path of the csv file of each layer, keyed by layer name.
+
+        Returns:
+            bool: Whether the compiled map is up to date with the sources.
+        """
+        if set(layers) != set(self.layers):
+            return False
+
+        for name, path in layers.items():
+            layer = self.layers[name]
+            if layer['source'] != path or not os.path.isfile(path):
+                return False
+
+            compiled = layer['fingerprint']
+            current = _fingerprint(path, with_hash=False)
+            if current['mtime_ns'] == compiled['mtime_ns'] and current['size'] == compiled['size']:
+                continue
+            current = _fingerprint(path)
+            if current['sha1'] != compiled['sha1']:
+                return False
+            layer['fingerprint'] = current
+            self.stale_stamps = True
+
+        return True
+
+    def restamp(self, path: str) -> None:
+        """Writes the current fingerprints of the sources in the compiled file
+
+        The payload is copied as is, the memory mapping stays valid on the replaced file.
+
+        Args:
+            path (str): The path of the compiled map.
+        """
+        header = {'cols': self.cols, 'rows': self.rows, 'layers': self.layers}
+        _write(path, header, self._mmap[self._payload_start:])
+        self.stale_stamps = False
+
+    def cells(self, name: str) -> Iterator[Tuple[int, int, int]]:
+        """Iterates over the non-empty cells of a layer
+
+        The arrays of the layer are copied out of the memory mapping first, so that a generator
+        left unfinished holds no buffer on the mapping and never prevents closing it.
+
+        Args:
+            name (str): The name of the layer.
+
+        Yields:
+            Tuple[int, int, int]: The column, the row and the value of each non-empty cell.
+        """
+        layer = self.layers[name]
+        start = self._payload_start + layer['offset']
+        size = 4 * layer['count']
+
+        cells = array('I', self._mmap[start:start + size])
+        values = array('i', self._mmap[start + size:start + 2 * size])
+
+        for cell, value in zip(cells, values):
+            row, col = divmod(cell, self.cols)
+            yield col, row, value
+
+
+def load_map(
+        layers: Optional[Dict[str, str]] = None,
+        path: Optional[str] = None,
+        force: bool = False
+    ) -> CompiledMap:
+    """Loads a compiled map, compiling it first if it is missing or outdated
+
+    Args:
+        layers (Dict[str, str], optional): The csv file of each layer. Defaults to
+            config.map_layers.
+        path (str, optional): The path of the compiled map. Defaults to config.compiled_map_path.
+        force (bool, optional): Whether to compile the map even if it is up to date. Defaults to
+            False.
+
+    Returns:
+        CompiledMap: The memory-mapped compiled map.
+    """
+    layers = layers or config.map_layers
+    path = path or config.compiled_map_path
+
+    if not force and os.path.isfile(path):
+        try:
+            compiled_map = CompiledMap(path)
+        except (ValueError, struct.error, json.JSONDecodeError):
+            compiled_map = None
+
+        if compiled_map is not None:
+            if compiled_map.is_fresh(layers):
+                if compiled_map.stale_stamps:
+                    # The sources were touched but not changed, not hashing them on the next load
+                    try:
+                        compiled_map.restamp(path)
+                    except OSError:
+                        pass
+                return compiled_map
+            compiled_map.close()
+
+    compile_map(layers, path)
+    return CompiledMap(path)
+
+
+def main() -> None:
+    """Command line entry point of the map compiler"""
+    parser = argparse.ArgumentParser(description='Compile the csv map layers into a binary file')
+    parser.add_argument('--output', default=config.compiled_map_path, help='compiled map path')
+    parser.add_argument('--force', action='store_true', help='compile even if up to date')
+    args = parser.parse_args()
+
+    with load_map(config.map_layers, args.output, force=args.force) as compiled_map:
+        counts = ', '.join(
+            f'{name}: {layer["count"]}' for name, layer in compiled_map.layers.items()
+        )
+        print(f'{args.output} ({compiled_map.cols}x{compiled_map.rows}) - {counts}')
+
+
+if __name__ == '__main__':
+    main()
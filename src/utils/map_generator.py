@@ -0,0 +1,220 @@
+"""Procedural generator of large maps, written as csv layers like the hand-made map
+
+The generated map is surrounded by boundary tiles and scattered with small wall blocks, objects,
+grass and monsters, the player standing in a clear area in the middle. The generation only depends
+on its parameters and seed, so that the same huge world can be generated again to load it in the
+`Level` or in the benchmarks.
+
+The layers are written in a folder, with the file names of `config.map_layers`. A level is built
+from them by pointing `config.map_layers` (and `config.compiled_map_path`) to the generated files,
+which `map_layers` and `compiled_map_path` return.
+
+Usage:
+    python -m src.utils.map_generator --size 500 500 --output lib/data/generated [--seed 0]
+        [--grass 0.1] [--objects 0.02] [--walls 0.01] [--monster squid=200 --monster 391=50]
+        [--object-count 21] [--compile]
+"""
+from __future__ import absolute_import
+
+import argparse
+import os
+import random
+from array import array
+from typing import Dict, List, Optional
+
+from src.config import config
+from src.utils.map_compiler import compile_map
+
+
+BOUNDARY_ID = 395
+GRASS_IDS = (8, 9, 10)
+EMPTY = -1
+
+OBJECTS_PATH = 'lib/images/objects'
+
+# The radius in tiles of the clear area around the player
+CLEAR_RADIUS = 2
+
+
+def map_layers(directory: str) -> Dict[str, str]:
+    """Returns the paths of the csv layers of a generated map
+
+    Args:
+        directory (str): The folder of the generated map.
+
+    Returns:
+        Dict[str, str]: The path of each layer, keyed as `config.map_layers`.
+    """
+    return {
+        name: os.path.join(directory, os.path.basename(path))
+        for name, path in config.map_layers.items()
+    }
+
+
+def compiled_map_path(directory: str) -> str:
+    """Returns the path of the compiled file of a generated map
+
+    Args:
+        directory (str): The folder of the generated map.
+
+    Returns:
+        str: The path of the compiled map.
+    """
+    return os.path.join(directory, os.path.basename(config.compiled_map_path))
+
+
+def _write_layer(path: str, values: array, cols: int) -> None:
+    with open(path, 'w', encoding='cp1252') as layer_file:
+        for start in range(0, len(values), cols):
+            layer_file.write(','.join(map(str, values[start:start + cols])))
+            layer_file.write('\n')
+
+
+def generate_map(
+        cols: int,
+        rows: int,
+        directory: str,
+        seed: int = 0,
+        grass_density: float = 0.1,
+        object_density: float = 0.02,
+        wall_density: float = 0.01,
+        monsters: Optional[Dict[str, int]] = None,
+        object_count: Optional[int] = None
+    ) -> Dict[str, str]:
+    """Generates a map and writes its csv layers
+
+    Args:
+        cols (int): The number of columns of the map.
+        rows (int): The number of rows of the map.
+        directory (str): The folder to write the layers in, created if needed.
+        seed (int, optional): The seed of the generation. Defaults to 0.
+        grass_density (float, optional): The share of the free tiles covered with grass. Defaults
+            to 0.1.
+        object_density (float, optional): The share of the free tiles holding an object. Defaults
+            to 0.02.
+        wall_density (float, optional): The share of the tiles covered by wall blocks. Defaults to
+            0.01.
+        monsters (Dict[str, int], optional): The number of monsters of each tile id of
+            `config.monster_tile_ids`. Defaults to one monster of each type per 2000 tiles.
+        object_count (int, optional): The number of object graphics, the object ids being drawn
+            below it. Defaults to the number of images in the objects folder.
+
+    Returns:
+        Dict[str, str]: The path of each layer, keyed as `config.map_layers`.
+
+    Raises:
+        ValueError: If the map is too small, or has not enough free tiles for the monsters.
+    """
+    if cols < 2 * CLEAR_RADIUS + 3 or rows < 2 * CLEAR_RADIUS + 3:
+        raise ValueError(f'The map must be at least {2 * CLEAR_RADIUS + 3} tiles wide and high')
+
+    rng = random.Random(seed)
+    if monsters is None:
+        monsters = {tile_id: cols * rows // 2000 for tile_id in config.monster_tile_ids}
+    if object_count is None:
+        object_count = len(os.listdir(OBJECTS_PATH)) if os.path.isdir(OBJECTS_PATH) else 1
+
+    size = cols * rows
+    layers = {name: array('i', [EMPTY]) * size for name in config.map_layers}
+    taken = bytearray(size)
+
+    # Boundary around the map and small wall blocks inside
+    boundary = layers['boundary']
+    for col in range(cols):
+        boundary[col] = boundary[size - cols + col] = BOUNDARY_ID
+    for row in range(rows):
+        boundary[row * cols] = boundary[row * cols + cols - 1] = BOUNDARY_ID
+    for _ in range(int(size * wall_density / 6)):
+        width, height = rng.randint(1, 3), rng.randint(1, 3)
+        left, top = rng.randrange(1, cols - width), rng.randrange(1, rows - height)
+        for row in range(top, top + height):
+            for col in range(left, left + width):
+                boundary[row * cols + col] = BOUNDARY_ID
+
+    # The player in the middle of a clear area
+    player_col, player_row = cols // 2, rows // 2
+    for row in range(player_row - CLEAR_RADIUS, player_row + CLEAR_RADIUS + 1):
+        for col in range(player_col - CLEAR_RADIUS, player_col + CLEAR_RADIUS + 1):
+            boundary[row * cols + col] = EMPTY
+            taken[row * cols + col] = 1
+    layers['entities'][player_row * cols + player_col] = int(config.player_tile_id)
+
+    free: List[int] = [
+        cell for cell in range(size) if not taken[cell] and boundary[cell] == EMPTY
+    ]
+    rng.shuffle(free)
+
+    # Objects, grass and monsters on distinct free tiles
+    object_total = int(len(free) * object_density)
+    grass_total = int(len(free) * grass_density)
+    monster_total = sum(monsters.values())
+    if object_total + grass_total + monster_total > len(free):
+        raise ValueError('Not enough free tiles for the objects, grass and monsters')
+
+    cells = iter(free)
+    for _ in range(object_total):
+        layers['object'][next(cells)] = rng.randrange(object_count)
+    for _ in range(grass_total):
+        layers['grass'][next(cells)] = rng.choice(GRASS_IDS)
+    for tile_id, count in monsters.items():
+        for _ in range(count):
+            layers['entities'][next(cells)] = int(tile_id)
+
+    os.makedirs(directory, exist_ok=True)
+    paths = map_layers(directory)
+    for name, values in layers.items():
+        _write_layer(paths[name], values, cols)
+
+    return paths
+
+
+def _parse_monster(value: str) -> List:
+    """Parses a `name=count` or `id=count` monster count"""
+    name, _, count = value.partition('=')
+    ids = {monster: tile_id for tile_id, monster in config.monster_tile_ids.items()}
+    tile_id = ids.get(name, name)
+    if tile_id not in config.monster_tile_ids:
+        raise argparse.ArgumentTypeError(f'unknown monster {name}')
+
+    return [tile_id, int(count)]
+
+
+def main() -> None:
+    """Command line entry point of the map generator"""
+    parser = argparse.ArgumentParser(description='Generate the csv layers of a large map')
+    parser.add_argument('--size', type=int, nargs=2, metavar=('COLS', 'ROWS'), required=True)
+    parser.add_argument('--output', required=True, help='folder of the generated layers')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grass', type=float, default=0.1, help='grass density')
+    parser.add_argument('--objects', type=float, default=0.02, help='object density')
+    parser.add_argument('--walls', type=float, default=0.01, help='wall density')
+    parser.add_argument(
+        '--monster',
+        type=_parse_monster,
+        action='append',
+        help='number of monsters of a type, as name=count or id=count (repeatable)'
+    )
+    parser.add_argument('--object-count', type=int, help='number of object graphics')
+    parser.add_argument('--compile', action='store_true', help='compile the generated map')
+    args = parser.parse_args()
+
+    cols, rows = args.size
+    layers = generate_map(
+        cols,
+        rows,
+        args.output,
+        seed=args.seed,
+        grass_density=args.grass,
+        object_density=args.objects,
+        wall_density=args.walls,
+        monsters=dict(args.monster) if args.monster else None,
+        object_count=args.object_count
+    )
+    if args.compile:
+        compile_map(layers, compiled_map_path(args.output))
+
+    print(f'{cols}x{rows} map written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
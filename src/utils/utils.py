@@ -2,12 +2,12 @@
 from __future__ import absolute_import
 
 from csv import reader
-from os import listdir
-from os.path import isfile, join
-from typing import List
+from typing import List, Sequence, Tuple
 
 import pygame
 
+from .assets import assets
+
 
 def import_csv_layout(path: str) -> List[List[int]]:
     """Import a csv floor data file and read it
@@ -32,11 +32,45 @@ def import_csv_layout(path: str) -> List[List[int]]:
 def import_image_from_folder(path: str) -> List[pygame.Surface]:
     """Import all the image in a folder as a surface
 
+    The surfaces are served by the shared asset registry, in natural file name order, and must not
+    be modified.
+
     Args:
         path (str): The path of the folder conatining the image to load
 
     Returns:
         List[pygame.Surface]: The list containing all the surfaces of the loaded image
     """
-    img_files = [f'{path}/{f}' for f in listdir(path) if isfile(join(path, f))]
-    return [pygame.image.load(img_path).convert_alpha() for img_path in img_files]
+    return assets.folder(path)
+
+
+def import_frames_from_folder(path: str) -> List[pygame.Surface]:
+    """Import all the animation frames in a folder, trimmed and packed in the texture atlas
+
+    Args:
+        path (str): The path of the folder conatining the frames to load
+
+    Returns:
+        List[pygame.Surface]: The frames, as subsurfaces of the shared atlas pages
+    """
+    return assets.frames(path)
+
+
+def blit_batch(
+        surface: pygame.Surface,
+        sequence: Sequence[Tuple[pygame.Surface, Tuple[int, int]]]
+    ) -> None:
+    """Blit a whole sequence of surfaces in a single call
+
+    Uses `Surface.fblits` when the pygame build provides it, `Surface.blits` otherwise.
+
+    Args:
+        surface (pygame.Surface): The surface to draw on.
+        sequence (Sequence[Tuple[pygame.Surface, Tuple[int, int]]]): The surfaces to draw with their
+            position, from the back to the front.
+    """
+    fblits = getattr(surface, 'fblits', None)
+    if fblits is not None:
+        fblits(sequence)
+    else:
+        surface.blits(sequence, doreturn=False)
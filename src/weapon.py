@@ -1,14 +1,16 @@
 """Contains the Weapon class for game weaponry"""
 from __future__ import absolute_import
 
-import pygame
-
 from .config import config
+from .pool import PooledSprite
+from .utils.assets import assets
 
 
-class Weapon(pygame.sprite.Sprite):
+class Weapon(PooledSprite):
     """A class representing a weapon for the game sprites.
 
+    The weapons are short lived, they can be recycled by a `SpritePool`.
+
     Attributes:
         image (pygame.Surface): The image representing the weapon.
         rect (pygame.Rect): The rectangular area occupied by the weapon on the screen.
@@ -21,22 +23,30 @@ class Weapon(pygame.sprite.Sprite):
     def __init__(self, player, *groups) -> None:
         """Initialize the Weapon object.
 
-        Loads the image for the weapon and sets its initial placement based on the player's
-        direction
-
         Args:
             player (Player): The player object associated with the weapon.
             *groups: Variable-length argument list of pygame Groups to which the weapon belongs.
         """
-        super().__init__(*groups)
+        super().__init__()
 
         self.sprite_type = 'weapon'
+        self.reset(player, *groups)
 
+    def reset(self, player, *groups) -> None:
+        """Arms the weapon for an attack of the player
+
+        Loads the image for the weapon, sets its placement based on the player's direction and
+        joins the groups.
+
+        Args:
+            player (Player): The player object associated with the weapon.
+            *groups: Variable-length argument list of pygame Groups to which the weapon belongs.
+        """
         direction = player.status.split('_')[0]
 
         # Graphics
-        weapon_path = f'lib/images//weapons/{player.weapon}/{direction}.png'
-        self.image = pygame.image.load(weapon_path).convert_alpha()
+        self.weapon_path = f'lib/images/weapons/{player.weapon}/{direction}.png'
+        self.image = assets.image(self.weapon_path)
 
         # Placement
         if direction == 'right':
@@ -51,3 +61,11 @@ class Weapon(pygame.sprite.Sprite):
         if direction == 'down':
             self.rect = self.image.get_rect(midtop=player.rect.midbottom + \
                 config.weapon_vertical_offset)
+
+        self.add(*groups)
+
+    def kill(self) -> None:
+        """Removes the weapon from its groups, releases its image and returns it to its pool"""
+        if self.alive():
+            assets.release(self.weapon_path)
+        super().kill()